@@ -1,5 +1,21 @@
 # pylint: disable=W0611
 from .auth import APIAuthClient
+from .cache import ContentCache
+from .cache import ResponseCache
+from .checkpoint import UploadCheckpointStore
+from .chunking import AdaptiveChunkSize
 from .client import APIClient
 from .config import InstanceConfiguration
 from .creds import AppCredentials
+from .download import ContentChangedException
+from .download import ParallelDownloader
+from .download import ResumableDownloader
+from .hashindex import HashIndex
+from .ratelimit import FileTokenBucket
+from .ratelimit import RateLimiter
+from .ratelimit import TokenBucket
+from .retry import CircuitBreaker
+from .retry import CircuitOpenException
+from .retry import RetryPolicy
+from .transport import HTTP2Transport
+from .transport import Transport
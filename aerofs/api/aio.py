@@ -0,0 +1,343 @@
+import asyncio
+import contextvars
+import itertools
+import json
+import time
+
+import aiohttp
+import requests
+
+from .client import APIClient
+from .client import DOWNLOAD_BUFFER_SIZE
+from .upload import Upload
+from .upload import fingerprint
+
+
+def _decode(body, content_type):
+    # Decode the body exactly as APIClient._handle_response would.
+    encoding = requests.utils.get_encoding_from_headers(
+        {'content-type': content_type or ''}) or 'utf-8'
+    text = body.decode(encoding, 'replace')
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text or 'ok'
+
+
+async def _next(reader):
+    try:
+        return await reader.__anext__()
+    except StopAsyncIteration:
+        return None
+
+
+async def _read_chunks(stream, chunk_size):
+    # Reads run on the default executor; chunk N+1 is read while chunk N is
+    # being sent.
+    loop = asyncio.get_running_loop()
+
+    def read():
+        size = chunk_size() if callable(chunk_size) else chunk_size
+        return stream.read(size)
+
+    pending = loop.run_in_executor(None, read)
+    try:
+        while True:
+            # Shielded: a read cannot be interrupted, so it is waited for.
+            chunk = await asyncio.shield(pending)
+            if not chunk:
+                return
+
+            pending = loop.run_in_executor(None, read)
+            yield chunk
+    finally:
+        # Closed early: the read ahead must not outlive the upload, which
+        # the caller may retry with the same stream.
+        if not pending.done():
+            await asyncio.wait([pending])
+        if not pending.cancelled():
+            pending.exception()  # retrieved, whatever it is
+
+
+# Asyncio counterpart of APIClient. Every route method of APIClient is
+# available with the same signature and returns an awaitable; all requests
+# share one aiohttp connection pool of up to `limit` connections. Must be
+# closed with `await client.close()` or used as an async context manager.
+class AsyncAPIClient(APIClient):
+    session = None  # an aiohttp session here, not the requests one
+
+    def __init__(self, instance_configuration, access_token, limit=100,
+                 session=None, **kwargs):
+        super(AsyncAPIClient, self).__init__(instance_configuration,
+                                             access_token, **kwargs)
+
+        # An aiohttp session may be shared between clients; it is then left
+        # open by close().
+        self.session = session
+        self.limit = limit
+        self._owns_session = session is None
+        self._response_headers = contextvars.ContextVar('response_headers',
+                                                        default=None)
+
+    def _default_transport(self):
+        return None  # requests go through the aiohttp session
+
+    # Headers of the last response received by the calling task.
+
+    @property
+    def response_headers(self):
+        return self._response_headers.get()
+
+    @response_headers.setter
+    def response_headers(self, headers):
+        self._response_headers.set(headers)
+
+    def _session(self):
+        if self.session is None:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.limit))
+        return self.session
+
+    async def close(self):
+        if self.session is not None and self._owns_session:
+            await self.session.close()
+            self.session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *_):
+        await self.close()
+
+    # requests
+
+    async def _send(self, method, route, headers=None, **kwargs):
+        # Returns the response once retries are over, with its body unread;
+        # the caller must release it.
+        if not headers:
+            headers = self.auth_headers
+
+        url = '{}{}'.format(self.url_prefix, route)
+        retry = self.retry
+        idempotent = retry and retry.is_idempotent(method, headers)
+
+        for attempt in itertools.count():
+            if retry:
+                retry.check()
+            if self.rate_limiter:
+                await self._throttle(route)
+
+            try:
+                res = await self._session().request(method, url,
+                                                    headers=headers, **kwargs)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if not retry:
+                    raise
+
+                wait = retry.delay(attempt, idempotent)
+                if wait is None:
+                    raise
+            else:
+                wait = None
+                if retry:
+                    wait = retry.delay(attempt, idempotent, res.status,
+                                       res.headers)
+
+                if wait is None:
+                    try:
+                        res.raise_for_status()
+                    except aiohttp.ClientResponseError:
+                        res.release()
+                        raise
+
+                    self.response_headers = res.headers
+                    return res
+                res.release()
+
+            await asyncio.sleep(wait)
+
+    async def _do_request(self, method, route, headers=None, **kwargs):
+        res = await self._send(method, route, headers=headers, **kwargs)
+        try:
+            if res.status == 304:
+                return None
+            body = await res.read()
+        finally:
+            res.release()
+
+        return _decode(body, res.headers.get('Content-Type'))
+
+    async def _throttle(self, route):
+        for bucket in self.rate_limiter.buckets(route):
+            wait = bucket.reserve()
+            while wait:
+                await asyncio.sleep(wait)
+                wait = bucket.reserve()
+
+    def _do_delete(self, route, headers=None):
+        return self._do_request('DELETE', route, headers=headers)
+
+    def _do_get(self, route, headers=None):
+        return self._do_request('GET', route, headers=headers)
+
+    def _do_post(self, route, data, headers=None):
+        return self._do_request('POST', route, headers=headers, json=data)
+
+    def _do_put(self, route, data, serialize=True, headers=None):
+        if not headers:
+            headers = self.auth_headers
+
+        if serialize and data:
+            return self._do_request('PUT', route, headers=headers, json=data)
+
+        headers = {k: v for k, v in headers.items() if k != 'Content-Type'}
+        if hasattr(data, 'read'):
+            data = data.read()
+        return self._do_request('PUT', route, headers=headers, data=data)
+
+    async def _do_cached_get(self, route, headers):
+        cache = self.response_cache
+        if cache is None or 'If-None-Match' in headers:
+            return await self._do_get(route, headers=headers)
+
+        etag = cache.etag(route)
+        if etag:
+            headers = dict(headers, **{'If-None-Match': etag})
+
+        data = await self._do_get(route, headers=headers)
+        if data is None and etag:
+            cached = cache.hit(route)
+            if cached is not None:
+                return cached
+
+            # Evicted in the meantime.
+            headers = {k: v for k, v in headers.items()
+                       if k != 'If-None-Match'}
+            data = await self._do_get(route, headers=headers)
+
+        cache.store(route, self.metadata.etag, data)
+        return data
+
+    # file content
+
+    async def _get_cached_file_content(self, file_id):
+        cache = self.content_cache
+
+        cached = cache.lookup(file_id)
+        res = await self.open_file_content(
+            file_id, ifnonematch=[cached['etag']] if cached else None)
+        try:
+            data = None
+            content_type = res.headers.get('Content-Type')
+            if res.status == 304:
+                data = cache.read(file_id, cached['etag'])
+                content_type = cached['content_type']
+                if data is None:  # evicted in the meantime
+                    res.release()
+                    res = await self.open_file_content(file_id)
+                    content_type = res.headers.get('Content-Type')
+
+            if data is None:
+                data = cache.store(file_id, res.headers.get('ETag'),
+                                   content_type, [await res.read()])
+        finally:
+            res.release()
+
+        return _decode(data, content_type)
+
+    async def open_file_content(self, file_id, ranges=None, ifrange=None,
+                                ifnonematch=None):
+        headers = self._content_headers(ranges, ifrange, ifnonematch)
+
+        route = '/files/{}/content'.format(file_id)
+        return await self._send('GET', route, headers=headers)
+
+    async def iter_file_content(self, file_id, ranges=None, ifrange=None,
+                                ifnonematch=None,
+                                buffer_size=DOWNLOAD_BUFFER_SIZE):
+        res = await self.open_file_content(file_id, ranges=ranges,
+                                           ifrange=ifrange,
+                                           ifnonematch=ifnonematch)
+        try:
+            async for chunk in res.content.iter_chunked(buffer_size):
+                yield chunk
+        finally:
+            res.release()
+
+    async def download_file_content(self, file_id, fileobj, ranges=None,
+                                    ifrange=None, ifnonematch=None,
+                                    buffer_size=DOWNLOAD_BUFFER_SIZE):
+        size = 0
+        async for chunk in self.iter_file_content(file_id, ranges=ranges,
+                                                  ifrange=ifrange,
+                                                  ifnonematch=ifnonematch,
+                                                  buffer_size=buffer_size):
+            fileobj.write(chunk)
+            size += len(chunk)
+        return size
+
+    async def _put_chunk(self, upload, chunk):
+        start = time.time()
+        try:
+            await self._do_put(upload.route, chunk, serialize=False,
+                               headers=upload.chunk_headers(chunk))
+        except (aiohttp.ClientError, IOError):
+            upload.chunk_failed(chunk)
+            raise
+
+        upload.chunk_sent(chunk, time.time() - start)
+
+    async def upload_file_content(self, file_id, stream, ifmatch=None,
+                                  source_key=None):
+        source = None
+        if self.upload_checkpoints:
+            source = source_key or await asyncio.get_running_loop(
+                ).run_in_executor(None, fingerprint, stream)
+        upload = Upload(self, file_id, ifmatch, source)
+
+        headers = upload.resume_headers()
+        if headers:
+            try:
+                await self._do_put(upload.route, None, headers=headers)
+            except aiohttp.ClientResponseError:
+                upload.resume_failed()
+            else:
+                upload.resumed(self.response_headers)
+                await asyncio.get_running_loop().run_in_executor(
+                    None, upload.skip, stream)
+
+        reader = _read_chunks(stream, self._next_chunk_size)
+        try:
+            # Peek at up to two chunks to decide on the single-chunk path.
+            chunks = []
+            for _ in range(2):
+                chunk = await _next(reader)
+                if chunk is None:
+                    break
+                chunks.append(chunk)
+
+            if not upload.upload_id and len(chunks) == 1:
+                return await self._do_put(upload.route, chunks[0],
+                                          serialize=False)
+
+            if not upload.upload_id:
+                # Create upload identifier.
+                start = time.time()
+                await self._do_put(upload.route, None,
+                                   headers=upload.create_headers())
+                upload.created(self.metadata, time.time() - start)
+
+            # Upload content, one chunk at a time.
+            while chunks:
+                await self._put_chunk(upload, chunks.pop(0))
+                chunk = await _next(reader)
+                if chunk is not None:
+                    chunks.append(chunk)
+        finally:
+            await reader.aclose()
+
+        # Commit upload.
+        data = await self._do_put(upload.route, None,
+                                  headers=upload.commit_headers())
+        upload.committed()
+        return data
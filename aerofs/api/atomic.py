@@ -0,0 +1,17 @@
+import json
+import os
+import tempfile
+
+
+def replace(src, dst):
+    # Atomic on POSIX; os.replace is only available on Python3.
+    getattr(os, 'replace', os.rename)(src, dst)
+
+
+def write_json(path, value):
+    # Readers of `path` see either its previous content or all of `value`.
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),
+                               suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(value, f)
+    replace(tmp, path)
@@ -1,15 +1,29 @@
 import requests
 from future.utils import iteritems
 
+from .transport import Transport
+
 
 class APIAuthClient(object):
-    def __init__(self, instance_configuration, app_credentials):
+    def __init__(self, instance_configuration, app_credentials,
+                 transport=None):
         self.instance_configuration = instance_configuration
         self.app_credentials = app_credentials
 
         self.url_prefix = 'https://{}'.format(instance_configuration.hostname)
 
-        self.session = requests.Session()
+        self.transport = transport or Transport()
+
+    # The requests session of a Transport, on which callers may set proxies,
+    # certificates or adapters; None with other transports.
+
+    @property
+    def session(self):
+        return getattr(self.transport, 'session', None)
+
+    @session.setter
+    def session(self, session):
+        self.transport.session = session
 
     def get_authorization_url(self, scopes):
         scopes = ','.join(scopes)
@@ -29,8 +43,8 @@ class APIAuthClient(object):
             'grant_type': 'authorization_code',
             'code': code,
         }))
-        res = self.session.post(
-            '{}{}'.format(self.url_prefix, route), data=data,
+        res = self.transport.request(
+            'POST', '{}{}'.format(self.url_prefix, route), data=data,
             headers={'Content-Type': 'application/x-www-form-urlencoded'})
 
         try:
@@ -45,7 +59,8 @@ class APIAuthClient(object):
 
     def revoke_access_token(self, token):
         route = '/auth/token/{}'.format(token)
-        res = self.session.delete('{}{}'.format(self.url_prefix, route))
+        res = self.transport.request('DELETE',
+                                     '{}{}'.format(self.url_prefix, route))
         res.raise_for_status()
         return 'ok'
 
@@ -54,8 +69,8 @@ class APIAuthClient(object):
         data = {'access_token': token}
         # AeroFS does not create a resource server for 3rd party apps, so we
         # cannot actually use our own client id/secret here.
-        res = self.session.get(
-            '{}{}'.format(self.url_prefix, route), params=data,
+        res = self.transport.request(
+            'GET', '{}{}'.format(self.url_prefix, route), params=data,
             auth=('oauth-havre', 'i-am-not-a-restful-secret'))
         res.raise_for_status()
         return res.json()
@@ -0,0 +1,194 @@
+import collections
+import copy
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from .atomic import replace
+from .atomic import write_json
+
+
+def _digest(value):
+    return hashlib.sha1(value.encode('utf-8')).hexdigest()
+
+
+# On-disk cache of file content keyed by file id and ETag, bounded in size and
+# evicting least recently used entries first. Entries are written to
+# temporary files and renamed into place, and content files are named after
+# their ETag, so several processes can share one directory without readers
+# ever seeing a partially written or mismatched entry.
+class ContentCache(object):
+    def __init__(self, directory, max_size=1024 * 1024 * 1024):
+        self.directory = directory
+        self.max_size = max_size
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def _meta_path(self, file_id):
+        return os.path.join(self.directory,
+                            '{}.json'.format(_digest(file_id)))
+
+    def _data_path(self, file_id, etag):
+        return os.path.join(self.directory, '{}-{}.bin'.format(
+            _digest(file_id), _digest(etag)))
+
+    def _count(self, counter, n=1):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + n)
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'evictions': self.evictions}
+
+    def lookup(self, file_id):
+        try:
+            with open(self._meta_path(file_id), 'r') as f:
+                meta = json.load(f)
+        except (IOError, OSError, ValueError):
+            return None
+
+        if not os.path.exists(self._data_path(file_id, meta['etag'])):
+            return None
+        return meta
+
+    def read(self, file_id, etag):
+        path = self._data_path(file_id, etag)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path, None)  # most recently used
+        except (IOError, OSError):
+            return None
+
+        self._count('hits')
+        return data
+
+    def store(self, file_id, etag, content_type, chunks):
+        self._count('misses')
+
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        size = 0
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in chunks:
+                f.write(chunk)
+                size += len(chunk)
+
+        with open(tmp, 'rb') as f:
+            data = f.read()
+
+        if size > self.max_size or not etag:
+            os.remove(tmp)
+            return data
+
+        replace(tmp, self._data_path(file_id, etag))
+        write_json(self._meta_path(file_id),
+                   {'etag': etag, 'content_type': content_type})
+
+        self._evict(file_id, etag)
+        return data
+
+    def _evict(self, file_id, etag):
+        keep = self._data_path(file_id, etag)
+        prefix = '{}-'.format(_digest(file_id))
+
+        lock = None
+        if fcntl is not None:
+            lock = open(os.path.join(self.directory, '.lock'), 'w')
+            fcntl.flock(lock, fcntl.LOCK_EX)
+
+        try:
+            entries = []
+            for name in os.listdir(self.directory):
+                path = os.path.join(self.directory, name)
+                if not name.endswith('.bin') or path == keep:
+                    continue
+
+                try:
+                    if name.startswith(prefix):
+                        # Content of a superseded ETag.
+                        os.remove(path)
+                        continue
+
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+
+            total = sum(e[1] for e in entries)
+            if os.path.exists(keep):
+                total += os.path.getsize(keep)
+            for _, size, path in sorted(entries):
+                if total <= self.max_size:
+                    break
+
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                self._count('evictions')
+        finally:
+            if lock is not None:
+                lock.close()
+
+
+# In-memory cache of JSON response bodies keyed by route, holding the ETag
+# each body was served with so reads can be revalidated with If-None-Match.
+# Bounded to `max_entries`, evicting the least recently used route first.
+class ResponseCache(object):
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'evictions': self.evictions}
+
+    def etag(self, route):
+        with self._lock:
+            entry = self._entries.get(route)
+            return entry[0] if entry else None
+
+    def hit(self, route):
+        with self._lock:
+            entry = self._entries.pop(route, None)
+            if entry is None:
+                return None
+
+            self._entries[route] = entry  # most recently used
+            self.hits += 1
+            return copy.deepcopy(entry[1])
+
+    def store(self, route, etag, data):
+        with self._lock:
+            self.misses += 1
+            self._entries.pop(route, None)
+            if not etag:
+                return
+
+            self._entries[route] = (etag, copy.deepcopy(data))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
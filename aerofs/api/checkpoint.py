@@ -0,0 +1,40 @@
+import hashlib
+import json
+import os
+
+from .atomic import write_json
+
+
+# Persists the state of in-progress chunked uploads (Upload-ID, ETag, the
+# confirmed byte offset and digest, and what is being uploaded), one small
+# JSON file per file id, so that a failed or interrupted upload can be
+# resumed by a later call or process.
+class UploadCheckpointStore(object):
+    def __init__(self, directory):
+        self.directory = directory
+
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def _path(self, file_id):
+        name = hashlib.sha1(file_id.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, '{}.json'.format(name))
+
+    def get(self, file_id):
+        try:
+            with open(self._path(file_id), 'r') as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError):
+            return None
+
+    def put(self, file_id, upload_id, etag, offset, source=None,
+            digest=None):
+        write_json(self._path(file_id), {'upload_id': upload_id,
+                                         'etag': etag, 'offset': offset,
+                                         'source': source, 'digest': digest})
+
+    def delete(self, file_id):
+        try:
+            os.remove(self._path(file_id))
+        except OSError:
+            pass
@@ -0,0 +1,74 @@
+import collections
+import threading
+
+
+KB = 1024
+MB = 1024 * KB
+
+
+ChunkSample = collections.namedtuple('ChunkSample',
+                                     ['size', 'seconds', 'throughput'])
+
+
+# Picks the size of the next upload chunk from the measured throughput and
+# round-trip time of the previous ones. Like TCP slow start, the size doubles
+# until a chunk takes longer than `target_seconds` (or fails), then grows
+# additively and backs off multiplicatively. Chunks are kept at least a few
+# RTTs long so the per-chunk round trip does not dominate throughput.
+class AdaptiveChunkSize(object):
+    def __init__(self, initial=1 * MB, minimum=256 * KB, maximum=64 * MB,
+                 target_seconds=2.0, history=256):
+        if not minimum <= initial <= maximum:
+            raise ValueError('Initial chunk size must be within bounds.')
+
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_seconds = target_seconds
+
+        self.size = initial
+        self.rtt = None
+        self.samples = collections.deque(maxlen=history)
+
+        self._slow_start = True
+        self._lock = threading.Lock()
+
+    def _clamp(self, size):
+        return int(max(self.minimum, min(self.maximum, size)))
+
+    @property
+    def sizes(self):
+        return [s.size for s in self.samples]
+
+    def record_rtt(self, seconds):
+        with self._lock:
+            if self.rtt is None:
+                self.rtt = seconds
+            else:
+                self.rtt = 0.875 * self.rtt + 0.125 * seconds
+
+    def record_success(self, size, seconds):
+        seconds = max(seconds, 1e-6)
+        transfer = max(seconds - (self.rtt or 0), 1e-6)
+
+        with self._lock:
+            self.samples.append(ChunkSample(size, seconds, size / transfer))
+
+            # Several chunks are in flight at once: grow from the current
+            # size, not from that of the chunk read before the last change.
+            current = max(self.size, size)
+            if seconds > self.target_seconds:
+                # Scale down to what fits in the target duration.
+                self._slow_start = False
+                self.size = self._clamp(size * self.target_seconds / seconds)
+            elif self._slow_start:
+                self.size = self._clamp(current * 2)
+            elif seconds < self.target_seconds / 2 or \
+                    (self.rtt and seconds < 4 * self.rtt):
+                self.size = self._clamp(
+                    self.size + max(self.size // 4, self.minimum))
+
+    def record_failure(self, size):
+        with self._lock:
+            self.samples.append(ChunkSample(size, None, None))
+            self._slow_start = False
+            self.size = self._clamp(size // 2)
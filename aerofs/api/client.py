@@ -1,4 +1,8 @@
+import collections
 import io
+import itertools
+import threading
+import time
 import requests
 from future.utils import iteritems
 
@@ -9,15 +13,41 @@ except ImportError:
     # import quote_plus for Python2
     from urllib import quote_plus
 
+from .retry import RetryPolicy
+from .stream import ChunkReader
+from .stream import iter_response
+from .transport import Transport
+from .upload import Upload
+from .upload import fingerprint
+
 
 VERSION_PREFIX = '/api/v1.3'
-MAX_CHUNK_SIZE = 1024 * 1024 # 1 MB chunks.
+MAX_CHUNK_SIZE = 1024 * 1024 # 1 MB chunks, unless chunk_size is given.
+DOWNLOAD_BUFFER_SIZE = 64 * 1024
+
+
+class ResponseMetadata(collections.namedtuple(
+        'ResponseMetadata', ['etag', 'upload_id', 'content_type',
+                             'headers'])):
+    @classmethod
+    def from_headers(cls, headers):
+        headers = headers or {}
+        return cls(headers.get('ETag'), headers.get('Upload-ID'),
+                   headers.get('Content-Type'), headers)
 
 
 class APIClient(object):
-    def __init__(self, instance_configuration, access_token):
+    def __init__(self, instance_configuration, access_token,
+                 upload_checkpoints=None, chunk_size=None,
+                 content_cache=None, response_cache=None, transport=None,
+                 retry=None, rate_limiter=None, hash_index=None):
         self.instance_configuration = instance_configuration
         self.access_token = access_token
+        self.upload_checkpoints = upload_checkpoints
+        self.chunk_size = chunk_size
+        self.content_cache = content_cache
+        self.response_cache = response_cache
+        self.hash_index = hash_index
 
         self.auth_headers = {
             'Authorization': 'Bearer {}'.format(access_token),
@@ -27,55 +57,116 @@ class APIClient(object):
         self.url_prefix = 'https://{}{}'.format(
             instance_configuration.hostname, VERSION_PREFIX)
 
-        self.session = requests.Session()
+        self.transport = transport or self._default_transport()
+        self.retry = RetryPolicy() if retry is None else retry
+        self.rate_limiter = rate_limiter
+
+        self._local = threading.local()
+
+    def _default_transport(self):
+        return Transport()
+
+    # The requests session of a Transport, on which callers may set proxies,
+    # certificates or adapters; None with other transports.
+
+    @property
+    def session(self):
+        return getattr(self.transport, 'session', None)
+
+    @session.setter
+    def session(self, session):
+        self.transport.session = session
 
-        self.response_headers = None
+    # Headers and metadata of the last response received by the calling
+    # thread; a client may be shared by any number of threads.
+
+    @property
+    def response_headers(self):
+        return getattr(self._local, 'response_headers', None)
+
+    @response_headers.setter
+    def response_headers(self, headers):
+        self._local.response_headers = headers
+
+    @property
+    def metadata(self):
+        return ResponseMetadata.from_headers(self.response_headers)
 
     # requests
 
     def _handle_response(self, response):
         response.raise_for_status()
         self.response_headers = response.headers
+        if response.status_code == 304:
+            return None
+
         try:
             return response.json()
         except ValueError:
             return response.text or 'ok'
 
-    def _do_delete(self, route, headers=None):
+    def _request(self, method, route, headers=None, **kwargs):
         if not headers:
             headers = self.auth_headers
 
-        res = self.session.delete('{}{}'.format(self.url_prefix, route),
-                                  headers=headers)
+        url = '{}{}'.format(self.url_prefix, route)
+
+        def send():
+            if self.rate_limiter:
+                self.rate_limiter.acquire(route)
+            return self.transport.request(method, url, headers=headers,
+                                          **kwargs)
+
+        if not self.retry:
+            return send()
+
+        return self.retry.send(send, method, headers, data=kwargs.get('data'))
+
+    def _do_delete(self, route, headers=None):
+        res = self._request('DELETE', route, headers=headers)
         return self._handle_response(res)
 
     def _do_get(self, route, headers=None):
-        if not headers:
-            headers = self.auth_headers
-
-        res = self.session.get('{}{}'.format(self.url_prefix, route),
-                               headers=headers)
+        res = self._request('GET', route, headers=headers)
         return self._handle_response(res)
 
-    def _do_post(self, route, data, headers=None):
-        if not headers:
-            headers = self.auth_headers
+    def _do_cached_get(self, route, headers):
+        cache = self.response_cache
+        if cache is None or 'If-None-Match' in headers:
+            return self._do_get(route, headers=headers)
+
+        etag = cache.etag(route)
+        if etag:
+            headers = dict(headers, **{'If-None-Match': etag})
+
+        data = self._do_get(route, headers=headers)
+        if data is None and etag:
+            cached = cache.hit(route)
+            if cached is not None:
+                return cached
+
+            # Evicted in the meantime.
+            headers = {k: v for k, v in iteritems(headers)
+                       if k != 'If-None-Match'}
+            data = self._do_get(route, headers=headers)
 
-        res = self.session.post('{}{}'.format(self.url_prefix, route),
-                                json=data, headers=headers)
+        cache.store(route, self.metadata.etag, data)
+        return data
+
+    def _do_post(self, route, data, headers=None):
+        res = self._request('POST', route, headers=headers, json=data)
         return self._handle_response(res)
 
     def _do_put(self, route, data, serialize=True, headers=None):
         if not headers:
             headers = self.auth_headers
 
-        url = '{}{}'.format(self.url_prefix, route)
         if serialize and data:
-            res = self.session.put(url, json=data, headers=headers)
+            res = self._request('PUT', route, headers=headers, json=data)
         else:
             headers = {k: v for k, v in iteritems(headers)
                        if k != 'Content-Type'}
-            res = self.session.put(url, data=data, headers=headers)
+            res = self._request('PUT', route, headers=headers, data=data)
         return self._handle_response(res)
 
     # user object
@@ -162,7 +253,7 @@ class APIClient(object):
         return self._do_post(route, data)
 
     def move_folder(self, folder_id, parent_folder, foldername, ifmatch=None):
-        headers = self.auth_headers
+        headers = dict(self.auth_headers)
         if ifmatch:
             headers['If-Match'] = ifmatch
 
@@ -171,7 +262,7 @@ class APIClient(object):
         return self._do_put(route, data, headers=headers)
 
     def delete_folder(self, folder_id, ifmatch=None):
-        headers = self.auth_headers
+        headers = dict(self.auth_headers)
         if ifmatch:
             headers['If-Match'] = ifmatch
 
@@ -195,77 +286,158 @@ class APIClient(object):
         route = '/files/{}/path'.format(file_id)
         return self._do_get(route)
 
-    def get_file_content(self, file_id, ranges=None, ifrange=None,
-                         ifnonematch=None):
-        headers = self.auth_headers
+    def _get_cached_file_content(self, file_id):
+        cache = self.content_cache
+
+        cached = cache.lookup(file_id)
+        res = self.open_file_content(
+            file_id, ifnonematch=[cached['etag']] if cached else None)
+
+        data = None
+        headers = requests.structures.CaseInsensitiveDict(res.headers)
+        if res.status_code == 304:
+            res.close()
+            data = cache.read(file_id, cached['etag'])
+            headers['Content-Type'] = cached['content_type']
+            if data is None:  # evicted in the meantime
+                res = self.open_file_content(file_id)
+                headers = res.headers
+
+        if data is None:
+            data = cache.store(file_id, headers.get('ETag'),
+                               headers.get('Content-Type'),
+                               iter_response(res, DOWNLOAD_BUFFER_SIZE))
+
+        # Decode the body exactly as an uncached response would be.
+        response = requests.Response()
+        response.status_code = 200
+        response.headers = headers
+        response.encoding = requests.utils.get_encoding_from_headers(headers)
+        response._content = data  # pylint: disable=W0212
+        return self._handle_response(response)
+
+    def _content_headers(self, ranges, ifrange, ifnonematch):
+        headers = dict(self.auth_headers)
         if ranges:
             headers['Range'] = ','.join(ranges)
         if ifrange:
             headers['If-Range'] = ifrange
         if ifnonematch:
             headers['If-None-Match'] = ','.join(ifnonematch)
+        return headers
+
+    def get_file_content(self, file_id, ranges=None, ifrange=None,
+                         ifnonematch=None):
+        if self.content_cache is not None and \
+                not (ranges or ifrange or ifnonematch):
+            return self._get_cached_file_content(file_id)
+
+        headers = self._content_headers(ranges, ifrange, ifnonematch)
 
         route = '/files/{}/content'.format(file_id)
         return self._do_get(route, headers=headers)
 
+    # Returns the streamed response, which the caller must close, e.g. to
+    # inspect its status and Content-Range before reading the body.
+    def open_file_content(self, file_id, ranges=None, ifrange=None,
+                          ifnonematch=None):
+        headers = self._content_headers(ranges, ifrange, ifnonematch)
+
+        route = '/files/{}/content'.format(file_id)
+        res = self._request('GET', route, headers=headers, stream=True)
+        try:
+            res.raise_for_status()
+        except requests.exceptions.HTTPError:
+            res.close()
+            raise
+
+        self.response_headers = res.headers
+        return res
+
+    def iter_file_content(self, file_id, ranges=None, ifrange=None,
+                          ifnonematch=None, buffer_size=DOWNLOAD_BUFFER_SIZE):
+        res = self.open_file_content(file_id, ranges=ranges, ifrange=ifrange,
+                                     ifnonematch=ifnonematch)
+        return iter_response(res, buffer_size)
+
+    def download_file_content(self, file_id, fileobj, ranges=None,
+                              ifrange=None, ifnonematch=None,
+                              buffer_size=DOWNLOAD_BUFFER_SIZE):
+        size = 0
+        for chunk in self.iter_file_content(file_id, ranges=ranges,
+                                            ifrange=ifrange,
+                                            ifnonematch=ifnonematch,
+                                            buffer_size=buffer_size):
+            fileobj.write(chunk)
+            size += len(chunk)
+        return size
+
     def create_file(self, parent_folder, filename):
         route = '/files'
         data = {'parent': parent_folder, 'name': filename}
         return self._do_post(route, data)
 
-    def upload_file_content(self, file_id, stream, ifmatch=None):
-        route = '/files/{}/content'.format(file_id)
-
-        chunks = [stream.read(MAX_CHUNK_SIZE)]
-        while len(chunks[-1]) != 0:
-            chunks.append(stream.read(MAX_CHUNK_SIZE))
+    def _next_chunk_size(self):
+        if self.chunk_size is None:
+            return MAX_CHUNK_SIZE
+        return getattr(self.chunk_size, 'size', self.chunk_size)
 
-        chunks.pop()
-        if len(chunks) == 1:
-            return self._do_put(route, io.BytesIO(chunks[0]), serialize=False)
-
-        # Create upload identifier.
-        headers = dict(self.auth_headers, **{
-            'Content-Range': 'bytes */*',
-            'Content-Length': '0',
-        })
-        if ifmatch:
-            headers['If-Match'] = ','.join(ifmatch)
-
-        self._do_put(route, None, headers=headers)
-        upload_id = self.response_headers['Upload-ID']
-        etag = self.response_headers.get('ETag')
-
-        # Upload content, one chunk at a time.
-        total_bytes_sent = 0
-        for chunk in chunks:
-            headers = dict(self.auth_headers, **{
-                'Upload-ID': upload_id,
-                'Content-Range': 'bytes {}-{}/*'.format(
-                    total_bytes_sent,
-                    total_bytes_sent + len(chunk) - 1),
-            })
-            if etag:
-                headers['If-Match'] = etag
-
-            self._do_put(route, io.BytesIO(chunk), serialize=False,
-                         headers=headers)
-
-            total_bytes_sent += len(chunk)
+    def _put_chunk(self, upload, chunk):
+        start = time.time()
+        try:
+            self._do_put(upload.route, io.BytesIO(chunk), serialize=False,
+                         headers=upload.chunk_headers(chunk))
+        except (requests.exceptions.RequestException, IOError):
+            upload.chunk_failed(chunk)
+            raise
+
+        upload.chunk_sent(chunk, time.time() - start)
+
+    def upload_file_content(self, file_id, stream, ifmatch=None,
+                            source_key=None):
+        source = None
+        if self.upload_checkpoints:
+            source = source_key or fingerprint(stream)
+        upload = Upload(self, file_id, ifmatch, source)
+
+        headers = upload.resume_headers()
+        if headers:
+            try:
+                self._do_put(upload.route, None, headers=headers)
+            except requests.exceptions.HTTPError:
+                upload.resume_failed()
+            else:
+                upload.resumed(self.response_headers)
+                upload.skip(stream)
+
+        with ChunkReader(stream, self._next_chunk_size) as reader:
+            # Peek at up to two chunks to decide on the single-chunk path.
+            chunks = collections.deque(itertools.islice(reader, 2))
+            if not upload.upload_id and len(chunks) == 1:
+                return self._do_put(upload.route, io.BytesIO(chunks[0]),
+                                    serialize=False)
+
+            if not upload.upload_id:
+                # Create upload identifier.
+                start = time.time()
+                self._do_put(upload.route, None,
+                             headers=upload.create_headers())
+                upload.created(self.metadata, time.time() - start)
+
+            # Upload content, one chunk at a time; the reader fetches the next
+            # chunk from the stream while the current one is in flight.
+            while chunks:
+                self._put_chunk(upload, chunks.popleft())
+                chunks.extend(itertools.islice(reader, 1))
 
         # Commit upload.
-        headers = dict(self.auth_headers, **{
-            'Upload-ID': upload_id,
-            'Content-Range': 'bytes */{}'.format(total_bytes_sent),
-            'Content-Length': '0',
-        })
-        if etag:
-            headers['If-Match'] = etag
-
-        return self._do_put(route, None, headers=headers)
+        data = self._do_put(upload.route, None,
+                            headers=upload.commit_headers())
+        upload.committed()
+        return data
 
     def move_file(self, file_id, parent_folder, filename, ifmatch=None):
-        headers = self.auth_headers
+        headers = dict(self.auth_headers)
         if ifmatch:
             headers['If-Match'] = ','.join(ifmatch)
 
@@ -274,7 +446,7 @@ class APIClient(object):
         return self._do_put(route, data, headers=headers)
 
     def delete_file(self, file_id, ifmatch=None):
-        headers = self.auth_headers
+        headers = dict(self.auth_headers)
         if ifmatch:
             headers['If-Match'] = ','.join(ifmatch)
 
@@ -284,20 +456,20 @@ class APIClient(object):
     # shared folder object
 
     def get_shared_folders(self, email, ifnonematch=None):
-        headers = self.auth_headers
+        headers = dict(self.auth_headers)
         if ifnonematch:
             headers['If-None-Match'] = ','.join(ifnonematch)
 
         route = '/users/{}/shares'.format(email)
-        return self._do_get(route, headers=headers)
+        return self._do_cached_get(route, headers)
 
     def get_shared_folder(self, share_id, ifnonematch=None):
-        headers = self.auth_headers
+        headers = dict(self.auth_headers)
         if ifnonematch:
             headers['If-None-Match'] = ','.join(ifnonematch)
 
         route = '/shares/{}'.format(share_id)
-        return self._do_get(route, headers=headers)
+        return self._do_cached_get(route, headers)
 
     def create_shared_folder(self, foldername):
         route = '/shares'
@@ -307,20 +479,20 @@ class APIClient(object):
     # sf member object
 
     def get_sf_members(self, share_id, ifnonematch=None):
-        headers = self.auth_headers
+        headers = dict(self.auth_headers)
         if ifnonematch:
             headers['If-None-Match'] = ','.join(ifnonematch)
 
         route = '/shares/{}/members'.format(share_id)
-        return self._do_get(route, headers=headers)
+        return self._do_cached_get(route, headers)
 
     def get_sf_member(self, share_id, email, ifnonematch=None):
-        headers = self.auth_headers
+        headers = dict(self.auth_headers)
         if ifnonematch:
             headers['If-None-Match'] = ','.join(ifnonematch)
 
         route = '/shares/{}/members/{}'.format(share_id, email)
-        return self._do_get(route, headers=headers)
+        return self._do_cached_get(route, headers)
 
     def add_sf_member(self, share_id, email, permissions):
         route = '/shares/{}/members'.format(share_id)
@@ -328,7 +500,7 @@ class APIClient(object):
         return self._do_post(route, data)
 
     def update_sf_member(self, share_id, email, permissions, ifmatch=None):
-        headers = self.auth_headers
+        headers = dict(self.auth_headers)
         if ifmatch:
             headers['If-Match'] = ','.join(ifmatch)
 
@@ -337,7 +509,7 @@ class APIClient(object):
         return self._do_put(route, data, headers=headers)
 
     def remove_sf_member(self, share_id, email, ifmatch=None):
-        headers = self.auth_headers
+        headers = dict(self.auth_headers)
         if ifmatch:
             headers['If-Match'] = ','.join(ifmatch)
 
@@ -371,12 +543,12 @@ class APIClient(object):
     # sf pending member object
 
     def get_sf_pending_members(self, share_id, ifnonematch=None):
-        headers = self.auth_headers
+        headers = dict(self.auth_headers)
         if ifnonematch:
             headers['If-None-Match'] = ','.join(ifnonematch)
 
         route = '/shares/{}/pending'.format(share_id)
-        return self._do_get(route, headers=headers)
+        return self._do_cached_get(route, headers)
 
     def get_sf_pending_member(self, share_id, email):
         route = '/shares/{}/pending/{}'.format(share_id, email)
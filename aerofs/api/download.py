@@ -0,0 +1,194 @@
+import json
+import os
+import re
+import threading
+
+import requests
+from concurrent.futures import ThreadPoolExecutor
+
+from .atomic import replace
+from .client import DOWNLOAD_BUFFER_SIZE
+
+
+RANGE_SIZE = 8 * 1024 * 1024
+CONTENT_RANGE = re.compile(r'bytes (\d+)-(\d+)/(\d+|\*)')
+
+
+class ContentChangedException(Exception):
+    pass
+
+
+def content_range(response):
+    match = CONTENT_RANGE.match(response.headers.get('Content-Range', ''))
+    if not match:
+        return None, None, None
+
+    start, end, total = match.groups()
+    return int(start), int(end), None if total == '*' else int(total)
+
+
+def write_response(response, f, buffer_size, abort=None):
+    written = 0
+    try:
+        for chunk in response.iter_content(buffer_size):
+            if abort is not None and abort.is_set():
+                break
+            f.write(chunk)
+            written += len(chunk)
+    finally:
+        response.close()
+
+    return written
+
+
+# Downloads a file as several byte ranges fetched concurrently, each written
+# straight to its offset in a preallocated output file. Every range is pinned
+# to the ETag of the first response with If-Range, so a file modified
+# mid-transfer is detected instead of producing a mix of both versions.
+class ParallelDownloader(object):
+    def __init__(self, api, workers=4, range_size=RANGE_SIZE,
+                 buffer_size=DOWNLOAD_BUFFER_SIZE):
+        self.api = api
+        self.workers = workers
+        self.range_size = range_size
+        self.buffer_size = buffer_size
+
+    def download(self, file_id, path):
+        first = 'bytes=0-{}'.format(self.range_size - 1)
+        try:
+            res = self.api.open_file_content(file_id, ranges=[first])
+        except requests.exceptions.HTTPError as e:
+            if e.response is None or e.response.status_code != 416:
+                raise
+
+            # Empty file: no range is satisfiable.
+            open(path, 'wb').close()
+            return e.response.headers.get('ETag')
+
+        etag = res.headers.get('ETag')
+        _, _, total = content_range(res)
+        if res.status_code != 206 or total is None:
+            # Server sent the whole body; nothing to parallelize.
+            with open(path, 'wb') as f:
+                write_response(res, f, self.buffer_size)
+            return etag
+
+        with open(path, 'wb') as f:
+            f.truncate(total)
+            write_response(res, f, self.buffer_size)
+
+        ranges = [(start, min(start + self.range_size, total) - 1)
+                  for start in range(self.range_size, total, self.range_size)]
+        if not ranges:
+            return etag
+
+        abort = threading.Event()
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = [pool.submit(self._fetch, file_id, path, etag, start,
+                                   end, abort)
+                       for start, end in ranges]
+            try:
+                for future in futures:
+                    future.result()
+            except BaseException:
+                abort.set()
+                raise
+
+        return etag
+
+    def _fetch(self, file_id, path, etag, start, end, abort):
+        if abort.is_set():
+            return
+
+        res = self.api.open_file_content(
+            file_id, ranges=['bytes={}-{}'.format(start, end)], ifrange=etag)
+        if res.status_code != 206 or content_range(res)[:2] != (start, end):
+            res.close()
+            raise ContentChangedException(
+                'File {} changed during download.'.format(file_id))
+
+        with open(path, 'r+b') as f:
+            f.seek(start)
+            written = write_response(res, f, self.buffer_size, abort=abort)
+
+        if written != end - start + 1 and not abort.is_set():
+            raise IOError('Incomplete range {}-{} of file {}.'.format(
+                start, end, file_id))
+
+
+# Downloads a file into `<path>.partial`, remembering the ETag it was fetched
+# under. Interrupted transfers, whether within this call or from an earlier
+# process, continue from the partial file's size with Range and If-Range; the
+# download restarts from zero only if the server reports changed content.
+class ResumableDownloader(object):
+    def __init__(self, api, attempts=3, buffer_size=DOWNLOAD_BUFFER_SIZE):
+        self.api = api
+        self.attempts = attempts
+        self.buffer_size = buffer_size
+
+    def download(self, file_id, path):
+        partial = '{}.partial'.format(path)
+        state = '{}.json'.format(partial)
+
+        for attempt in range(self.attempts):
+            try:
+                etag = self._download(file_id, partial, state)
+                break
+            except (requests.exceptions.ConnectionError,
+                    requests.exceptions.ChunkedEncodingError,
+                    requests.exceptions.Timeout):
+                if attempt + 1 == self.attempts:
+                    raise
+
+        replace(partial, path)
+        os.remove(state)
+        return etag
+
+    def _download(self, file_id, partial, state):
+        etag = None
+        try:
+            with open(state, 'r') as f:
+                saved = json.load(f)
+            if saved['file_id'] == file_id:
+                etag = saved['etag']
+        except (IOError, OSError, ValueError, KeyError):
+            pass
+
+        offset = 0
+        if etag and os.path.exists(partial):
+            offset = os.path.getsize(partial)
+
+        if not offset:
+            res = self.api.open_file_content(file_id)
+        else:
+            try:
+                res = self.api.open_file_content(
+                    file_id, ranges=['bytes={}-'.format(offset)],
+                    ifrange=etag)
+            except requests.exceptions.HTTPError as e:
+                if e.response is None or e.response.status_code != 416:
+                    raise
+
+                # Partial file already holds the whole content.
+                return etag
+
+        mode = 'wb'
+        if res.status_code == 206 and content_range(res)[0] == offset:
+            mode = 'ab'
+        elif res.status_code == 206:
+            # Not the range asked for: start over with the whole content.
+            res.close()
+            res = self.api.open_file_content(file_id)
+            if res.status_code == 206:
+                res.close()
+                raise IOError('Unexpected partial content for file {}.'.format(
+                    file_id))
+
+        etag = res.headers.get('ETag')
+        with open(state, 'w') as f:
+            json.dump({'file_id': file_id, 'etag': etag}, f)
+
+        with open(partial, mode) as f:
+            write_response(res, f, self.buffer_size)
+
+        return etag
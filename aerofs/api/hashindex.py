@@ -0,0 +1,72 @@
+import hashlib
+import sqlite3
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
+
+HASH_BUFFER_SIZE = 1024 * 1024
+
+
+def digest(stream, algorithm='sha256'):
+    # Digest of the rest of `stream`, a seekable file object, which is rewound
+    # to its current position afterwards.
+    start = stream.tell()
+    h = hashlib.new(algorithm)
+    try:
+        while True:
+            block = stream.read(HASH_BUFFER_SIZE)
+            if not block:
+                break
+            if not isinstance(block, bytes):
+                block = block.encode('utf-8')
+            h.update(block)
+    finally:
+        stream.seek(start)
+    return '{}:{}'.format(algorithm, h.hexdigest())
+
+
+# Remembers a digest of the content last uploaded to each file, keyed by the
+# file id and the ETag the upload resulted in, in an SQLite database that may
+# be shared between processes. File.save_content uses it to skip uploading
+# content the server already has. Digests are computed on `workers`
+# background threads, so hashing overlaps with other requests.
+class HashIndex(object):
+    def __init__(self, path, algorithm='sha256', workers=2):
+        self.path = path
+        self.algorithm = algorithm
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._db:
+            self._db.execute('CREATE TABLE IF NOT EXISTS digests ('
+                             'file_id TEXT PRIMARY KEY, '
+                             'etag TEXT NOT NULL, '
+                             'digest TEXT NOT NULL)')
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+
+    def get(self, file_id, etag):
+        with self._lock:
+            row = self._db.execute(
+                'SELECT digest FROM digests WHERE file_id = ? AND etag = ?',
+                (file_id, etag)).fetchone()
+        return row[0] if row else None
+
+    def put(self, file_id, etag, digest):
+        with self._lock, self._db:
+            self._db.execute('INSERT OR REPLACE INTO digests VALUES (?, ?, ?)',
+                             (file_id, etag, digest))
+
+    def delete(self, file_id):
+        with self._lock, self._db:
+            self._db.execute('DELETE FROM digests WHERE file_id = ?',
+                             (file_id,))
+
+    def digest(self, stream):
+        # Returns a future of digest(stream), computed on a worker thread.
+        return self._pool.submit(digest, stream, self.algorithm)
+
+    def close(self):
+        self._pool.shutdown()
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,122 @@
+import os
+import re
+import struct
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+ROUTE_FAMILIES = (
+    ('content', re.compile(r'^/files/[^/]+/content')),
+    ('metadata', re.compile(r'')),
+)
+
+_clock = getattr(time, 'monotonic', time.time)
+
+
+# Token bucket refilled at `rate` tokens per second up to `burst` tokens,
+# shared by all threads holding a reference to it.
+class TokenBucket(object):
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst if burst is not None else max(1, rate))
+
+        self._tokens = self.burst
+        self._last = _clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, tokens, last, now, n):
+        tokens = min(self.burst, tokens + (now - last) * self.rate)
+        if tokens >= n:
+            return tokens - n, 0
+        return tokens, (n - tokens) / self.rate
+
+    def reserve(self, n=1):
+        # Takes `n` tokens and returns 0, or returns how long to wait before
+        # trying again.
+        with self._lock:
+            now = _clock()
+            self._tokens, wait = self._refill(self._tokens, self._last, now,
+                                              n)
+            self._last = now
+            return wait
+
+    def acquire(self, n=1):
+        wait = self.reserve(n)
+        while wait:
+            time.sleep(wait)
+            wait = self.reserve(n)
+
+
+# Token bucket whose state lives in a small file guarded by flock(2), shared
+# by every process on the host that uses the same path.
+class FileTokenBucket(TokenBucket):
+    STATE = struct.Struct('<dd')
+
+    def __init__(self, path, rate, burst=None):
+        if fcntl is None:
+            raise RuntimeError('FileTokenBucket requires fcntl (POSIX).')
+
+        super(FileTokenBucket, self).__init__(rate, burst)
+        self.path = path
+
+        self._fd = None
+        self._pid = None
+
+    def _file(self):
+        if self._pid != os.getpid():  # do not share descriptors across forks
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            self._pid = os.getpid()
+        return self._fd
+
+    def reserve(self, n=1):
+        with self._lock:
+            fd = self._file()
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                now = time.time()  # comparable between processes
+                os.lseek(fd, 0, os.SEEK_SET)
+                state = os.read(fd, self.STATE.size)
+                if len(state) == self.STATE.size:
+                    tokens, last = self.STATE.unpack(state)
+                else:
+                    tokens, last = self.burst, now
+
+                tokens, wait = self._refill(tokens, last, max(now, last), n)
+
+                os.lseek(fd, 0, os.SEEK_SET)
+                os.write(fd, self.STATE.pack(tokens, max(now, last)))
+                return wait
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+# Caps the request rate of one or more clients: `bucket` limits every request
+# and `families` maps route family names (see ROUTE_FAMILIES) to their own
+# buckets, e.g. to throttle content transfers separately from metadata calls.
+class RateLimiter(object):
+    def __init__(self, bucket=None, families=None, patterns=ROUTE_FAMILIES):
+        self.bucket = bucket
+        self.families = families or {}
+        self.patterns = patterns
+
+    def family(self, route):
+        for name, pattern in self.patterns:
+            if pattern.match(route):
+                return name
+        return None
+
+    def buckets(self, route):
+        buckets = [self.bucket] if self.bucket else []
+        family = self.families.get(self.family(route))
+        if family:
+            buckets.append(family)
+        return buckets
+
+    def acquire(self, route):
+        for bucket in self.buckets(route):
+            bucket.acquire()
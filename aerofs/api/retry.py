@@ -0,0 +1,149 @@
+import calendar
+import email.utils
+import itertools
+import random
+import threading
+import time
+
+import requests
+
+
+RETRY_STATUSES = frozenset([429, 502, 503, 504])
+
+_DEFAULT_BREAKER = object()
+
+
+class CircuitOpenException(requests.exceptions.ConnectionError):
+    pass
+
+
+# Stops sending requests to an instance that keeps failing. After
+# `failure_threshold` consecutive failed requests the circuit opens and
+# requests fail fast; every `reset_timeout` seconds a single trial request is
+# let through, and the first success closes the circuit again.
+class CircuitBreaker(object):
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self.failures = 0
+        self.opened_at = None
+
+        self._lock = threading.Lock()
+
+    def check(self):
+        with self._lock:
+            if self.opened_at is None:
+                return
+
+            now = time.time()
+            if now - self.opened_at < self.reset_timeout:
+                raise CircuitOpenException(
+                    'Instance unavailable; not sending request.')
+
+            # Let this request through as a trial.
+            self.opened_at = now
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.time()
+
+
+def retry_after(headers):
+    value = (headers or {}).get('Retry-After')
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    date = email.utils.parsedate_tz(value)
+    if date is None:
+        return None
+    return max(0.0, email.utils.mktime_tz(date) - calendar.timegm(
+        time.gmtime()))
+
+
+# Retries requests that failed with a transient error (connection errors and
+# RETRY_STATUSES), with exponential backoff and full jitter, honoring the
+# server's Retry-After. Only requests that are safe to repeat are retried:
+# GETs, PUTs conditioned with If-Match and upload chunks carrying an
+# Upload-ID.
+#
+# Each request that still fails after its last attempt counts once against
+# `breaker`, a CircuitBreaker by default; None disables it.
+class RetryPolicy(object):
+    def __init__(self, max_attempts=5, backoff=0.5, max_backoff=30.0,
+                 statuses=RETRY_STATUSES, breaker=_DEFAULT_BREAKER):
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.statuses = statuses
+        self.breaker = CircuitBreaker() if breaker is _DEFAULT_BREAKER \
+            else breaker
+
+    def is_idempotent(self, method, headers):
+        headers = headers or {}
+        if method in ('GET', 'HEAD'):
+            return True
+        return method == 'PUT' and ('If-Match' in headers or
+                                    'Upload-ID' in headers)
+
+    def check(self):
+        if self.breaker:
+            self.breaker.check()
+
+    def delay(self, attempt, idempotent, status=None, headers=None):
+        # Returns how long to wait before the next attempt, or None if the
+        # outcome (a status, or None for a connection error) is final.
+        if status is not None and status not in self.statuses:
+            if self.breaker:
+                self.breaker.record_success()
+            return None
+
+        wait = None
+        if idempotent and attempt + 1 < self.max_attempts:
+            wait = retry_after(headers)
+            if wait is None:
+                wait = random.uniform(0, min(self.max_backoff,
+                                             self.backoff * 2 ** attempt))
+            elif wait > self.max_backoff:
+                wait = None
+
+        if wait is None and self.breaker and status != 429:
+            # Final failure, whether or not the request could be retried;
+            # throttled responses mean the instance is up.
+            self.breaker.record_failure()
+        return wait
+
+    def send(self, request, method, headers, data=None):
+        idempotent = self.is_idempotent(method, headers)
+
+        for attempt in itertools.count():
+            self.check()
+            try:
+                response = request()
+            except (requests.exceptions.ConnectionError,
+                    requests.exceptions.Timeout):
+                wait = self.delay(attempt, idempotent)
+                if wait is None:
+                    raise
+            else:
+                wait = self.delay(attempt, idempotent, response.status_code,
+                                  response.headers)
+                if wait is None:
+                    return response
+                response.close()
+
+            if hasattr(data, 'seek'):
+                data.seek(0)
+            time.sleep(wait)
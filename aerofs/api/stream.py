@@ -0,0 +1,92 @@
+import threading
+
+try:
+    # import Queue for Python3
+    from queue import Empty, Full, Queue
+except ImportError:
+    # import Queue for Python2
+    from Queue import Empty, Full, Queue
+
+
+# Iterates over a stream in chunks, reading ahead on a worker thread. At most
+# `readahead` chunks are buffered beyond the one held by the consumer, so
+# memory stays bounded while reads overlap with sending the current chunk.
+# `chunk_size` may be a callable, evaluated before each read.
+class ChunkReader(object):
+    def __init__(self, stream, chunk_size, readahead=1):
+        self.stream = stream
+        self.chunk_size = chunk_size
+
+        self._queue = Queue(maxsize=readahead)
+        self._closed = threading.Event()
+        self._finished = False
+
+        self._thread = threading.Thread(target=self._read)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _put(self, item):
+        while not self._closed.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except Full:
+                continue
+
+        return False
+
+    def _read(self):
+        try:
+            while not self._closed.is_set():
+                size = self.chunk_size
+                if callable(size):
+                    size = size()
+
+                chunk = self.stream.read(size)
+                if not self._put((chunk, None)) or not chunk:
+                    return
+        except Exception as e:  # pylint: disable=W0703
+            self._put((None, e))
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._finished:
+            raise StopIteration()
+
+        chunk, error = self._queue.get()
+        if error is not None:
+            self._finished = True
+            raise error
+        if not chunk:
+            self._finished = True
+            raise StopIteration()
+
+        return chunk
+
+    next = __next__  # Python2
+
+    def close(self):
+        self._closed.set()
+        self._finished = True
+        try:
+            while True:
+                self._queue.get_nowait()
+        except Empty:
+            pass
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+def iter_response(response, buffer_size):
+    try:
+        for chunk in response.iter_content(buffer_size):
+            yield chunk
+    finally:
+        response.close()
@@ -0,0 +1,106 @@
+import requests
+from requests.adapters import HTTPAdapter
+
+
+# HTTP/1.1 transport on a requests session. Connections are kept alive and
+# pooled per host, so repeated calls skip the TCP and TLS handshakes; one
+# transport may be shared by any number of clients and threads.
+# `host_pool_sizes` overrides `pool_maxsize` for specific hostnames.
+class Transport(object):
+    def __init__(self, pool_connections=10, pool_maxsize=10, pool_block=False,
+                 host_pool_sizes=None, timeout=None, verify=True):
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        self.session.verify = verify
+
+        adapter = HTTPAdapter(pool_connections=pool_connections,
+                              pool_maxsize=pool_maxsize,
+                              pool_block=pool_block)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        for hostname, size in (host_pool_sizes or {}).items():
+            self.session.mount('https://{}/'.format(hostname), HTTPAdapter(
+                pool_connections=1, pool_maxsize=size,
+                pool_block=pool_block))
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        return self.session.request(method, url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+class HTTP2Response(object):
+    def __init__(self, response):
+        self.response = response
+
+    @property
+    def status_code(self):
+        return self.response.status_code
+
+    @property
+    def headers(self):
+        return self.response.headers
+
+    @property
+    def content(self):
+        return self.response.content
+
+    @property
+    def text(self):
+        return self.response.text
+
+    def json(self):
+        return self.response.json()
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(
+                '{} Error for url: {}'.format(self.status_code,
+                                              self.response.url),
+                response=self)
+
+    def iter_content(self, chunk_size=1):
+        return self.response.iter_bytes(chunk_size)
+
+    def close(self):
+        self.response.close()
+
+
+# HTTP/2 transport on httpx (install with `pip install httpx[http2]`). Many
+# concurrent requests to one host are multiplexed over a single connection.
+# Responses mimic the parts of the requests API used by the clients, and
+# errors are raised as requests exceptions, so both transports are
+# interchangeable.
+class HTTP2Transport(object):
+    def __init__(self, max_connections=10, timeout=None, verify=True):
+        import httpx
+
+        self.client = httpx.Client(
+            http2=True, timeout=timeout, verify=verify,
+            limits=httpx.Limits(max_connections=max_connections,
+                                max_keepalive_connections=max_connections))
+
+    def request(self, method, url, headers=None, params=None, data=None,
+                json=None, auth=None, stream=False):
+        import httpx
+
+        if hasattr(data, 'read'):
+            data = data.read()
+
+        request = self.client.build_request(method, url, headers=headers,
+                                            params=params, content=data,
+                                            json=json)
+        try:
+            return HTTP2Response(self.client.send(request, auth=auth,
+                                                  stream=stream))
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.Timeout(e)
+        except httpx.TransportError as e:
+            raise requests.exceptions.ConnectionError(e)
+
+    def close(self):
+        self.client.close()
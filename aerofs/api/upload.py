@@ -0,0 +1,195 @@
+import hashlib
+import io
+
+
+FINGERPRINT_SIZE = 1024 * 1024
+READ_SIZE = 1024 * 1024
+
+
+def committed_bytes(headers):
+    committed_range = headers.get('Range')
+    if not committed_range:
+        return 0
+    return int(committed_range.rsplit('-', 1)[1]) + 1
+
+
+def _bytes(data):
+    return data if isinstance(data, bytes) else data.encode('utf-8')
+
+
+def fingerprint(stream, size=FINGERPRINT_SIZE):
+    # Identifies the content left in `stream` by its length and a digest of
+    # its first `size` bytes; None if the stream is not seekable.
+    try:
+        start = stream.tell()
+        head = stream.read(size)
+        stream.seek(0, io.SEEK_END)
+        length = stream.tell() - start
+        stream.seek(start)
+    except (AttributeError, IOError, OSError, ValueError):
+        return None
+
+    return '{}:{}'.format(length, hashlib.sha1(_bytes(head)).hexdigest())
+
+
+# The chunked upload protocol of one file, without any network I/O: builds
+# the headers of each request and tracks the upload identifier, ETag and
+# confirmed offset, checkpointing them as the upload progresses. APIClient
+# and AsyncAPIClient send the requests and report their outcome.
+#
+# Checkpoints record `source`, which identifies the content being uploaded
+# (see fingerprint), and the SHA-1 of the bytes the server committed. An
+# upload is only resumed from a checkpoint of the same source and, when
+# `ifmatch` is given, of one of those ETags, and only once skip() has found
+# the same committed bytes at the start of the stream. Without a source, no
+# checkpoint is used.
+class Upload(object):
+    def __init__(self, api, file_id, ifmatch=None, source=None):
+        self.api = api
+        self.file_id = file_id
+        self.route = '/files/{}/content'.format(file_id)
+        self.ifmatch = ifmatch
+        self.source = source
+
+        self.upload_id = None
+        self.etag = None
+        self.offset = 0
+        self._digest = hashlib.sha1()
+
+        self._checkpoints = api.upload_checkpoints if source else None
+        self._checkpoint = None
+
+    def _headers(self, **extra):
+        headers = dict(self.api.auth_headers, **extra)
+        if self.upload_id:
+            headers['Upload-ID'] = self.upload_id
+        if self.etag:
+            headers['If-Match'] = self.etag
+        return headers
+
+    def _save(self):
+        if self._checkpoints:
+            self._checkpoints.put(self.file_id, self.upload_id, self.etag,
+                                  self.offset, self.source,
+                                  self._digest.hexdigest())
+
+    # resuming
+
+    def resume_headers(self):
+        # Headers asking the server how much of the checkpointed upload it
+        # has committed; None if there is nothing to resume.
+        if not self._checkpoints:
+            return None
+        self._checkpoint = self._checkpoints.get(self.file_id)
+        if not self._checkpoint:
+            return None
+        etag = self._checkpoint['etag']
+        if self._checkpoint.get('source') != self.source or \
+                (self.ifmatch and etag not in self.ifmatch):
+            # Another content, or an ETag the caller does not expect.
+            self._checkpoints.delete(self.file_id)
+            return None
+
+        headers = dict(self.api.auth_headers, **{
+            'Upload-ID': self._checkpoint['upload_id'],
+            'Content-Range': 'bytes */*',
+            'Content-Length': '0',
+        })
+        if self._checkpoint['etag']:
+            headers['If-Match'] = self._checkpoint['etag']
+        return headers
+
+    def resumed(self, headers):
+        if committed_bytes(headers) != self._checkpoint['offset']:
+            # The committed bytes are not those checkpointed; start over.
+            self._checkpoints.delete(self.file_id)
+            return
+        self.upload_id = self._checkpoint['upload_id']
+        self.etag = self._checkpoint['etag']
+        self.offset = self._checkpoint['offset']
+
+    def resume_failed(self):
+        # Upload expired or file changed since; start over.
+        self._checkpoints.delete(self.file_id)
+
+    def skip(self, stream):
+        # Reads past the committed bytes of a resumed upload, checking that
+        # the stream starts with them. If it does not, the stream is rewound
+        # and the upload started over; IOError if it cannot be rewound.
+        if not self.upload_id:
+            return
+
+        try:
+            start = stream.tell()
+        except (AttributeError, IOError, OSError, ValueError):
+            start = None
+
+        digest = hashlib.sha1()
+        remaining = self.offset
+        while remaining > 0:
+            data = _bytes(stream.read(min(remaining, READ_SIZE)))
+            if not data:
+                break
+            digest.update(data)
+            remaining -= len(data)
+
+        if not remaining and \
+                digest.hexdigest() == self._checkpoint.get('digest'):
+            self._digest = digest
+            return
+
+        self._checkpoints.delete(self.file_id)
+        self.upload_id = None
+        self.etag = None
+        self.offset = 0
+        try:
+            stream.seek(start)
+        except (AttributeError, IOError, OSError, TypeError, ValueError):
+            raise IOError('Content of file {} differs from the interrupted '
+                          'upload and cannot be read again.'.format(
+                              self.file_id))
+
+    # uploading
+
+    def create_headers(self):
+        headers = dict(self.api.auth_headers, **{
+            'Content-Range': 'bytes */*',
+            'Content-Length': '0',
+        })
+        if self.ifmatch:
+            headers['If-Match'] = ','.join(self.ifmatch)
+        return headers
+
+    def created(self, metadata, seconds):
+        if hasattr(self.api.chunk_size, 'record_rtt'):
+            self.api.chunk_size.record_rtt(seconds)
+
+        self.upload_id = metadata.upload_id
+        self.etag = metadata.etag
+        self._save()
+
+    def chunk_headers(self, chunk):
+        return self._headers(**{'Content-Range': 'bytes {}-{}/*'.format(
+            self.offset, self.offset + len(chunk) - 1)})
+
+    def chunk_sent(self, chunk, seconds):
+        if hasattr(self.api.chunk_size, 'record_success'):
+            self.api.chunk_size.record_success(len(chunk), seconds)
+
+        self.offset += len(chunk)
+        self._digest.update(_bytes(chunk))
+        self._save()
+
+    def chunk_failed(self, chunk):
+        if hasattr(self.api.chunk_size, 'record_failure'):
+            self.api.chunk_size.record_failure(len(chunk))
+
+    def commit_headers(self):
+        return self._headers(**{
+            'Content-Range': 'bytes */{}'.format(self.offset),
+            'Content-Length': '0',
+        })
+
+    def committed(self):
+        if self._checkpoints:
+            self._checkpoints.delete(self.file_id)
@@ -6,10 +6,22 @@ from .file import File
 from .folder import Folder
 from .group import Group
 from .group_member import GroupMember
+from .identity import IdentityMap
+from .identity import identity_map
 from .invitation import Invitation
 from .invitee import Invitee
+from .iterators import iter_groups
+from .iterators import iter_users
+from .listing import Listing
+from .mirror import Mirror
+from .provision import UserRecord
+from .provision import provision_users
+from .provision import read_csv
+from .reconcile import ACLReconciler
+from .reconcile import ShareACL
 from .shared_folder import SharedFolder
 from .shared_folder_group_member import SFGroupMember
 from .shared_folder_member import SFMember
 from .shared_folder_pending_member import SFPendingMember
+from .unit import UnitOfWork
 from .user import User
@@ -12,3 +12,16 @@ class ContentState(enum.Enum):
 class Permission(enum.Enum):
     WRITE = 'WRITE'
     MANAGE = 'MANAGE'
+
+
+_permission_sets = {}
+
+
+def permission_set(permissions):
+    # Members share the same few permission sets; each is built only once.
+    key = frozenset(permissions)
+    try:
+        return _permission_sets[key]
+    except KeyError:
+        return _permission_sets.setdefault(
+            key, frozenset([Permission(p) for p in permissions]))
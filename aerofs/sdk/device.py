@@ -1,3 +1,4 @@
+from .identity import shared
 from .interface import APIObject
 from .interface import readonly
 from .interface import synced
@@ -6,6 +7,8 @@ from .interface import synced
 @readonly('online', sync=False)
 @readonly('last_seen', sync=False)
 class DeviceStatus(object):
+    __slots__ = ('_online', '_last_seen')
+
     def __init__(self):
         self._online = None
         self._last_seen = None
@@ -22,6 +25,9 @@ class DeviceStatus(object):
 @readonly('install_date')
 @readonly('status')
 class Device(APIObject):
+    __slots__ = ('_id', '_name', '_owner', '_os_family', '_install_date',
+                 '_status')
+
     def __init__(self, api, did=None):
         super(Device, self).__init__(api)
 
@@ -36,7 +42,7 @@ class Device(APIObject):
         self._id = json['id']
         self._name = json['name']
         from .user import User
-        self._owner = User(self.api, json['owner'])
+        self._owner = shared(User, self.api, json['owner'])
         self._os_family = json['os_family']
         self._install_date = json['install_date']
         return self
@@ -1,3 +1,6 @@
+import requests
+
+
 class APIException(Exception):
     pass
 
@@ -12,3 +15,15 @@ class ReadOnlyException(APIException):
 
 class WriteOnlyException(APIException):
     pass
+
+
+class ConflictException(APIException):
+    pass
+
+
+def http_status(e):
+    # The status of the response that caused `e`, None for other errors.
+    if isinstance(e, requests.exceptions.HTTPError) and \
+            e.response is not None:
+        return e.response.status_code
+    return None
@@ -1,10 +1,20 @@
 from .common import ContentState
+from .identity import identity_map
+from .identity import invalidate_listings
+from .identity import shared
 from .interface import APIObject
+from .interface import Projectable
 from .interface import enable_etags
 from .interface import readonly
 from .interface import synced
 
 
+def _seekable(stream):
+    if not hasattr(stream, 'seek'):
+        return False
+    return not hasattr(stream, 'seekable') or stream.seekable()
+
+
 @readonly('id', sync=False)
 @synced('name')
 @synced('parent')
@@ -14,7 +24,10 @@ from .interface import synced
 @readonly('path')
 @synced('content')
 @readonly('content_state')
-class File(APIObject):
+class File(Projectable, APIObject):
+    __slots__ = ('_id', '_name', '_parent', '_last_modified', '_size',
+                 '_mime_type', '_path', '_content', '_content_state')
+
     def __init__(self, api, fid=None):
         super(File, self).__init__(api)
 
@@ -30,57 +43,105 @@ class File(APIObject):
         self._content_state = None
 
     def from_json(self, json):
-        self._id = json['id']
-        self._name = json['name']
+        self._last_modified = None  # not present on empty files
+        self._size = None  # not present on empty files
+        self._content_state = ContentState.UNKNOWN
+        return self.merge_json(json)
+
+    def merge_json(self, json):
+        if 'id' in json:
+            self._id = json['id']
+        if 'name' in json:
+            self._name = json['name']
         if 'parent' in json:  # not present in Children
             from .folder import Folder
-            self._parent = Folder(self.api, json['parent'])
-        self._last_modified = json.get('last_modified')  # not present on empty
-                                                         # files
-        self._size = json.get('size')  # not present on empty files
-        self._mime_type = json['mime_type']
+            self._parent = shared(Folder, self.api, json['parent'])
+        if 'last_modified' in json:
+            self._last_modified = json['last_modified']
+        if 'size' in json:
+            self._size = json['size']
+        if 'mime_type' in json:
+            self._mime_type = json['mime_type']
 
         # https://bitbucket.org/logilab/pylint/issues/729/enums-on-python-27-from-the-enum34-package
         # pylint: disable=E1136
-        self._content_state = ContentState[json.get('content_state',
-                                                    'UNKNOWN')]
+        if 'content_state' in json:
+            self._content_state = ContentState[json['content_state']]
         return self
 
     @enable_etags
-    def load(self):
-        data = self.api.get_file(self.id)
-        self.from_json(data)
+    def load(self, fields=None):
+        data = self.api.get_file(self.id, fields=fields)
+        if fields:
+            self.merge_json(data)
+        else:
+            self.from_json(data)
 
     @enable_etags
     def load_content(self):
         self._content = self.api.get_file_content(self.id)
 
-        self._mime_type = self.api.response_headers['Content-Type']
+        self._mime_type = self.api.metadata.content_type
+
+    @enable_etags
+    def download(self, destination, resume=False):
+        if hasattr(destination, 'write'):
+            self.api.download_file_content(self.id, destination)
+        elif resume:
+            from ..api import ResumableDownloader
+            ResumableDownloader(self.api).download(self.id, destination)
+        else:
+            with open(destination, 'wb') as f:
+                self.api.download_file_content(self.id, f)
+
+        self._mime_type = self.api.metadata.content_type
 
     def load_path(self):
         data = self.api.get_folder_path(self.id)
 
         from .folder import Folder
-        self._path = [Folder(self.api).from_json(f) for f in data['folders']]
+        self._path = [shared(Folder, self.api, f['id']).from_json(f)
+                      for f in data['folders']]
 
     def save_content(self, matching=False):
         if not matching:
             self._etags = None
 
+        # With a HashIndex, content identical to what was last uploaded is
+        # not sent again; the current ETag is fetched while it is hashed.
+        # When matching, it must also be one of the known ETags: otherwise
+        # the upload is made, and fails its If-Match precondition.
+        index = getattr(self.api, 'hash_index', None)
+        digest = None
+        if index is not None and _seekable(self._content):
+            digest = index.digest(self._content)
+            data = self.api.get_file(self.id)
+            etag = self.api.metadata.etag
+            digest = digest.result()
+
+            if etag and index.get(self.id, etag) == digest and \
+                    (not self._etags or etag in self._etags):
+                self.from_json(data)
+                self._etags = [etag]
+                return
+
         self.api.upload_file_content(self.id, self._content,
                                      ifmatch=self._etags)
         self.load()  # new metadata
 
+        if digest and self._etags:
+            index.put(self.id, self._etags[0], digest)
+
     def save_name(self):
         self.move(self.parent.id, self.name, matching=True)
 
-    def save_parent(self):
-        self.move(self.parent.id, self.name, matching=True)
+    save_parent = save_name
 
     @enable_etags
     def create(self, parent_id, name):
         data = self.api.create_file(parent_id, name)
         self.from_json(data)
+        invalidate_listings(self.api, self, parent_id)
 
     @enable_etags
     def move(self, parent_id, name, matching=False):
@@ -90,9 +151,13 @@ class File(APIObject):
         data = self.api.move_file(self.id, parent_id, name,
                                   ifmatch=self._etags)
         self.from_json(data)
+        self._path = None
+        invalidate_listings(self.api, self, parent_id)
 
     def delete(self, matching=False):
         if not matching:
             self._etags = None
 
         self.api.delete_file(self.id, ifmatch=self._etags)
+        invalidate_listings(self.api, self)
+        identity_map(self.api).invalidate(File, self.id)
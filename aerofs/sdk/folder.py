@@ -1,4 +1,14 @@
+import collections
+
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+
+from .identity import identity_map
+from .identity import invalidate_listings
+from .identity import shared
 from .interface import APIObject
+from .interface import Projectable
 from .interface import enable_etags
 from .interface import readonly
 from .interface import synced
@@ -8,6 +18,8 @@ from .interface import synced
 @readonly('files', sync=False)
 @readonly('folders', sync=False)
 class Children(APIObject):
+    __slots__ = ('_id', '_files', '_folders')
+
     def __init__(self, api, pid):
         super(Children, self).__init__(api)
 
@@ -19,10 +31,11 @@ class Children(APIObject):
 
     def from_json(self, json):
         from .file import File
-        self._files = frozenset([File(self.api).from_json(f)
+        self._files = frozenset([shared(File, self.api, f['id']).from_json(f)
                                  for f in json['files']])
-        self._folders = frozenset([Folder(self.api).from_json(f)
-                                   for f in json['folders']])
+        self._folders = frozenset(
+            [shared(Folder, self.api, f['id']).from_json(f)
+             for f in json['folders']])
         return self
 
 
@@ -33,7 +46,14 @@ class Children(APIObject):
 @readonly('shared_folder')
 @readonly('path')
 @readonly('children')
-class Folder(APIObject):
+class Folder(Projectable, APIObject):
+    __slots__ = ('_id', '_name', '_parent', '_is_shared', '_shared_folder',
+                 '_path', '_children')
+
+    # The shared folder is only known from `sid`, sent alongside `is_shared`.
+    api_fields = {'is_shared': ('is_shared', 'sid'),
+                  'shared_folder': ('is_shared', 'sid')}
+
     def __init__(self, api, fid=None):
         super(Folder, self).__init__(api)
 
@@ -46,40 +66,77 @@ class Folder(APIObject):
         self._children = None
 
     def from_json(self, json):
-        self._id = json['id']
-        self._name = json['name']
+        return self.merge_json(json)
+
+    def merge_json(self, json):
+        if 'id' in json:
+            self._id = json['id']
+        if 'name' in json:
+            self._name = json['name']
         if 'parent' in json:  # not present in Path / Children
-            self._parent = Folder(self.api, json['parent'])
-        self._is_shared = json['is_shared']
-        if self._is_shared:
-            from .shared_folder import SharedFolder
-            self._shared_folder = SharedFolder(self.api, json['sid'])
+            self._parent = shared(Folder, self.api, json['parent'])
+        if 'is_shared' in json:
+            self._is_shared = json['is_shared']
+            sid = json.get('sid')  # absent unless requested, see api_fields
+            if self._is_shared and sid:
+                from .shared_folder import SharedFolder
+                self._shared_folder = shared(SharedFolder, self.api, sid)
         return self
 
     @enable_etags
-    def load(self):
-        data = self.api.get_folder(self.id)
-        self.from_json(data)
+    def load(self, fields=None):
+        data = self.api.get_folder(self.id, fields=fields)
+        if fields:
+            self.merge_json(data)
+        else:
+            self.from_json(data)
 
     def load_children(self):
         data = self.api.get_folder_children(self.id)
         self._children = Children(self.api, self.id).from_json(data)
+        identity_map(self.api).add_listing(self)
+
+    def list_children(self):
+        # Columnar, read-only listing; see Listing.
+        from .listing import Listing
+        return Listing.from_json(self.api.get_folder_children(self.id))
+
+    def walk(self, workers=8, max_depth=None, prune=None,
+             max_pending=10000, cache=False):
+        # Yields (folder, subfolders, files) as each listing arrives; see
+        # walk_listings. Subfolders for which `prune` returns True are not
+        # descended into. Listings are only kept as the folders' children,
+        # as load_children does, with `cache`: a whole tree may not fit.
+        def skip(json):
+            return prune(shared(Folder, self.api, json['id']).from_json(json))
+
+        for json, data in walk_listings(self.api, self.id, workers=workers,
+                                        max_depth=max_depth,
+                                        prune=prune and skip,
+                                        max_pending=max_pending):
+            folder = self if json['id'] == self.id else \
+                shared(Folder, self.api, json['id']).from_json(json)
+            children = Children(self.api, folder.id).from_json(data)
+            if cache:
+                folder._children = children
+                identity_map(self.api).add_listing(folder)
+            yield folder, children.folders, children.files
 
     def load_path(self):
         data = self.api.get_folder_path(self.id)
-        self._path = tuple([Folder(self.api).from_json(f)
+        self._path = tuple([shared(Folder, self.api, f['id']).from_json(f)
                             for f in data['folders']])
 
     def save_name(self):
         self.move(self.parent.id, self.name, matching=True)
 
-    def save_parent(self):
-        self.move(self.parent.id, self.name, matching=True)
+    save_parent = save_name
 
     @enable_etags
     def create(self, parent_id, name):
         data = self.api.create_folder(parent_id, name)
         self.from_json(data)
+        invalidate_listings(self.api, self, parent_id)
 
     @enable_etags
     def move(self, parent_id, name, matching=False):
@@ -89,6 +146,8 @@ class Folder(APIObject):
         data = self.api.move_folder(self.id, parent_id, name,
                                     ifmatch=self._etags)
         self.from_json(data)
+        self._path = None
+        invalidate_listings(self.api, self, parent_id)
 
     # TODO: Disabled pending API v1.4
     # def share(self):
@@ -100,3 +159,57 @@ class Folder(APIObject):
             self._etags = None
 
         self.api.delete_folder(self.id, ifmatch=self._etags)
+        invalidate_listings(self.api, self)
+        identity_map(self.api).invalidate(Folder, self.id)
+
+
+def walk_listings(api, folder_id, workers=8, max_depth=None, prune=None,
+                  max_pending=10000):
+    # Lists the tree under `folder_id` breadth-first, up to `workers` folders
+    # at once, and yields (folder, listing) as each listing arrives: the
+    # folder as it appears in its parent's listing ({'id': folder_id} for the
+    # root) and the response of get_folder_children. Subfolders for which
+    # `prune`, given their JSON, returns True are not descended into.
+    #
+    # At most `max_pending` folders are queued. Subfolders that do not fit
+    # are left in their listing, and those listings are walked depth first
+    # until the queue has room again, so memory stays bounded on wide trees.
+    pending = collections.deque([({'id': folder_id}, 0)])
+    overflow = []  # (subfolders not queued yet, depth)
+
+    def take():
+        while overflow:
+            subfolders, depth = overflow[-1]
+            subfolder = next(subfolders, None)
+            if subfolder is not None:
+                return subfolder, depth
+            overflow.pop()
+        return pending.popleft() if pending else None
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        running = {}
+        while pending or overflow or running:
+            while len(running) < workers:
+                item = take()
+                if item is None:
+                    break
+                future = pool.submit(api.get_folder_children, item[0]['id'])
+                running[future] = item
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                folder, depth = running.pop(future)
+                data = future.result()
+                yield folder, data
+
+                if max_depth is not None and depth >= max_depth:
+                    continue
+                subfolders = (f for f in data['folders']
+                              if prune is None or not prune(f))
+                while len(pending) < max_pending:
+                    subfolder = next(subfolders, None)
+                    if subfolder is None:
+                        break
+                    pending.append((subfolder, depth + 1))
+                else:
+                    overflow.append((subfolders, depth + 1))
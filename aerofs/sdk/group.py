@@ -1,3 +1,4 @@
+from .identity import identity_map
 from .interface import APIObject
 from .interface import readonly
 
@@ -6,6 +7,8 @@ from .interface import readonly
 @readonly('name')
 @readonly('members')
 class Group(APIObject):
+    __slots__ = ('_id', '_name', '_members')
+
     def __init__(self, api, gid=None):
         super(Group, self).__init__(api)
 
@@ -31,3 +34,4 @@ class Group(APIObject):
 
     def delete(self):
         self.api.delete_group(self.id)
+        identity_map(self.api).invalidate(Group, self.id)
@@ -1,3 +1,4 @@
+from .identity import shared
 from .interface import APIObject
 from .interface import readonly
 
@@ -7,11 +8,13 @@ from .interface import readonly
 @readonly('first_name')
 @readonly('last_name')
 class GroupMember(APIObject):
+    __slots__ = ('_group', '_email', '_first_name', '_last_name')
+
     def __init__(self, api, gid, email=None):
         super(GroupMember, self).__init__(api)
 
         from .group import Group
-        self._group = Group(self.api, gid)
+        self._group = shared(Group, self.api, gid)
 
         self._email = email
         self._first_name = None
@@ -30,7 +33,7 @@ class GroupMember(APIObject):
         return NotImplemented
 
     def __hash__(self):
-        return hash(tuple(sorted(self.__dict__.items())))
+        return hash((self._group._id, self._email))
 
     def from_json(self, json):
         self._email = json['email']
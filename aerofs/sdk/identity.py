@@ -0,0 +1,120 @@
+import collections
+import itertools
+import threading
+import weakref
+
+
+# Maps (type, key) to the one object standing for that entity within a single
+# client, so that listings, parents, owners and inviters referring to the same
+# entity share its loaded state. Entries are weak references: an object is
+# dropped as soon as nothing else holds on to it.
+class IdentityMap(object):
+    def __init__(self):
+        self._objects = weakref.WeakValueDictionary()
+        # Folders holding a listing, by folder id then id(), and the folder
+        # ids whose listings hold each child id.
+        self._listings = {}
+        self._children = {}
+        self._holders = {}
+        self._dead = collections.deque()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._objects)
+
+    def get(self, cls, key):
+        return self._objects.get((cls, key))
+
+    def resolve(self, cls, key, factory):
+        with self._lock:
+            o = self._objects.get((cls, key))
+            if o is None:
+                o = factory()
+                self._objects[(cls, key)] = o
+            return o
+
+    def add_listing(self, folder):
+        # Tracks a folder holding a listing, shared or not, so that it can be
+        # invalidated.
+        children = folder._children
+        child_ids = set(c.id for c in itertools.chain(children.files,
+                                                      children.folders))
+        dead = self._dead
+        with self._lock:
+            self._purge()
+            ref = weakref.ref(folder, lambda r, k=(folder.id, id(folder)):
+                              dead.append((k, r)))
+            self._listings.setdefault(folder.id, {})[id(folder)] = ref
+            self._children.setdefault(folder.id, set()).update(child_ids)
+            for child_id in child_ids:
+                self._holders.setdefault(child_id, set()).add(folder.id)
+
+    def pop_listings(self, child_id, folder_ids=()):
+        # Stops tracking the listings of `folder_ids` and of the folders
+        # holding `child_id`; returns those folders.
+        with self._lock:
+            self._purge()
+            folder_ids = set(folder_ids) | self._holders.get(child_id, set())
+            folders = []
+            for folder_id in folder_ids:
+                refs = self._forget(folder_id)
+                folders.extend(f for f in (r() for r in refs) if f is not None)
+            return folders
+
+    def _forget(self, folder_id):
+        for child_id in self._children.pop(folder_id, ()):
+            holders = self._holders[child_id]
+            holders.discard(folder_id)
+            if not holders:
+                del self._holders[child_id]
+        return self._listings.pop(folder_id, {}).values()
+
+    def _purge(self):
+        # Drops the listings of collected folders; weakref callbacks only
+        # queue them, as they may run while the lock is held.
+        while self._dead:
+            (folder_id, key), ref = self._dead.popleft()
+            refs = self._listings.get(folder_id)
+            if refs is not None and refs.get(key) is ref:
+                del refs[key]
+                if not refs:
+                    self._forget(folder_id)
+
+    def invalidate(self, cls, key):
+        with self._lock:
+            self._objects.pop((cls, key), None)
+
+    def clear(self):
+        with self._lock:
+            self._objects.clear()
+            self._listings.clear()
+            self._children.clear()
+            self._holders.clear()
+            self._dead.clear()
+
+
+_maps = weakref.WeakKeyDictionary()
+_maps_lock = threading.Lock()
+
+
+def identity_map(api):
+    with _maps_lock:
+        objects = _maps.get(api)
+        if objects is None:
+            objects = _maps[api] = IdentityMap()
+        return objects
+
+
+def shared(cls, api, key):
+    # Returns the object for entity `key` of `cls` known to `api`, creating
+    # it on first use.
+    if key is None:
+        return cls(api)
+    return identity_map(api).resolve(cls, key, lambda: cls(api, key))
+
+
+def invalidate_listings(api, o, *folder_ids):
+    # Drops the cached listings of folders `o` was moved into, out of or
+    # deleted from: those of `folder_ids` and any still holding `o`.
+    for folder in identity_map(api).pop_listings(o.id, folder_ids):
+        folder._children = None
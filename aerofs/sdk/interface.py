@@ -1,87 +1,141 @@
+import itertools
+import operator
+
 from .error import APIException
 from .error import ReadOnlyException
 from .error import WriteOnlyException
+from .unit import active_unit
 
 
 def enable_etags(fn):
     def enable_etags_wrapper(self, *args, **kwargs):
         fn(self, *args, **kwargs)
-        etag = self.api.response_headers.get('ETag')
+        etag = self.api.metadata.etag
         if etag:
-            self.__dict__['_etags'] = [etag]
+            self._etags = [etag]
 
     return enable_etags_wrapper
 
 
-def get_sync(o, field):
-    NoneType = type(None)
-    if isinstance(o.__dict__['_' + field], NoneType):
+# Attributes of API objects are properties over the slot holding their value,
+# `_<field>`. Loaders (`load_<field>`, else `load`) and savers (`save_<field>`)
+# are looked up once per class, and reading a loaded field costs one C-level
+# slot access plus a None check.
+class Field(property):
+    def __init__(self, field, fget, fset, fdel):
+        super(Field, self).__init__(fget, fset, fdel)
+        self.field = field
+        self.slot = '_' + field
+
+        self.loaders = {}
+        self.savers = {}
+
+    def bind(self, c):
+        self.loader(c)
+        self.saver(c)
+        setattr(c, self.field, self)
+        return c
+
+    def loader(self, c):
+        try:
+            return self.loaders[c]
+        except KeyError:
+            return self.loaders.setdefault(
+                c, getattr(c, 'load_{}'.format(self.field), None))
+
+    def saver(self, c):
         try:
-            getattr(o, 'load_{}'.format(field))()
-        except AttributeError:
+            return self.savers[c]
+        except KeyError:
+            return self.savers.setdefault(
+                c, getattr(c, 'save_{}'.format(self.field), None))
+
+    def fetch(self, o):
+        value = getattr(o, self.slot)
+        if value is not None:
+            return value
+
+        loader = self.loader(type(o))
+        if loader is not None:
+            loader(o)
+        elif o._projection:
+            o.load(fields=o.projected(self.field))
+        else:
             o.load()
 
-    if isinstance(o.__dict__['_' + field], NoneType):
-        raise APIException('Could not retrieve {}.'.format(field))
+        value = getattr(o, self.slot)
+        if value is None:
+            raise APIException('Could not retrieve {}.'.format(self.field))
+        return value
 
-    return o.__dict__['_' + field]
+    def store(self, o, v):
+        saver = self.saver(type(o))
+        unit = active_unit()
+        if unit is not None and saver is not None:
+            unit.defer(o, self.slot, v, saver)
+            return
 
+        setattr(o, self.slot, v)
+        if saver is None:
+            raise APIException('No method for syncing {}'.format(self.field))
+        saver(o)
 
-def set_sync(o, field, v):
-    o.__dict__['_' + field] = v
-    try:
-        getattr(o, 'save_{}'.format(field))()
-    except AttributeError:
-        raise APIException('No method for syncing {}'.format(field))
+    def clear(self, o):
+        self.store(o, None)
 
+    def read_only(self, *_):
+        raise ReadOnlyException('{} is a read-only field.'.format(self.field))
 
-def raise_(ex):
-    raise ex
+    def write_only(self, _):
+        raise WriteOnlyException(
+            '{} is a write-only field.'.format(self.field))
 
+    def undefined(self, _):
+        raise APIException(
+            'Could not delete {}: undefined behaviour.'.format(self.field))
 
-def readonly(field, sync=True):
-    def readonly_decorator(c):
-        setattr(c, field, property(
-            lambda o: get_sync(o, field) if sync else o.__dict__['_' + field],
-            lambda _, __: raise_(ReadOnlyException(
-                '{} is a read-only field.'.format(field))),
-            lambda _: raise_(ReadOnlyException(
-                '{} is a read-only field.'.format(field)))))
-        return c
 
-    return readonly_decorator
+class ReadOnlyField(Field):
+    def __init__(self, field, sync=True):
+        fget = self.fetch if sync else operator.attrgetter('_' + field)
+        super(ReadOnlyField, self).__init__(field, fget, self.read_only,
+                                            self.read_only)
 
 
-def synced(field):
-    def synced_decorator(c):
-        setattr(c, field, property(
-            lambda o: get_sync(o, field),
-            lambda o, v: set_sync(o, field, v),
-            lambda _: raise_(APIException(
-                'Could not delete {}: undefined behaviour.'.format(field)))))
-        return c
+class SyncedField(Field):
+    def __init__(self, field):
+        super(SyncedField, self).__init__(field, self.fetch, self.store,
+                                          self.undefined)
 
-    return synced_decorator
 
+class WriteOnlyField(Field):
+    def __init__(self, field):
+        super(WriteOnlyField, self).__init__(field, self.write_only,
+                                             self.store, self.clear)
 
-def writeonly(field):
-    def writeonly_decorator(c):
-        setattr(c, field, property(
-            lambda _: raise_(WriteOnlyException(
-                '{} is a write-only field.'.format(field))),
-            lambda o, v: set_sync(o, field, v),
-            lambda o: set_sync(o, field, None)))
-        return c
 
-    return writeonly_decorator
+def readonly(field, sync=True):
+    return ReadOnlyField(field, sync).bind
+
+
+def synced(field):
+    return SyncedField(field).bind
+
+
+def writeonly(field):
+    return WriteOnlyField(field).bind
 
 
 @readonly('etags', sync=False)
 class APIObject(object):
+    # Subclasses declare their own __slots__: listings hold many objects.
+    __slots__ = ('api', '_etags', '_projection', '__weakref__')
+
     def __init__(self, api):
         self.api = api
 
         self._etags = None
+        self._projection = None  # set by project(), see Projectable
 
     def from_json(self, _json):
         raise NotImplementedError()
@@ -99,5 +153,25 @@ class APIObject(object):
             return self.id != other.id
         return NotImplemented
 
+    # Consistent with __eq__; an object should not be hashed before its id is
+    # known (e.g. before create()).
     def __hash__(self):
-        return hash(tuple(sorted(self.__dict__.items())))
+        return hash(self._id)
+
+
+# Mixin of objects whose load() accepts the API fields to fetch. project()
+# declares the only attributes to fetch when lazily loading one of them;
+# `api_fields` maps attributes to their API fields, when not the same name.
+class Projectable(object):
+    __slots__ = ()
+
+    api_fields = {}
+
+    def project(self, *fields):
+        self._projection = frozenset(itertools.chain.from_iterable(
+            self.api_fields.get(f, (f,)) for f in fields))
+        return self
+
+    def projected(self, field):
+        return sorted(self._projection.union(
+            self.api_fields.get(field, (field,))))
@@ -1,4 +1,5 @@
-from .common import Permission
+from .common import permission_set
+from .identity import shared
 from .interface import APIObject
 from .interface import readonly
 
@@ -9,11 +10,13 @@ from .interface import readonly
 @readonly('inviter')
 @readonly('permissions')
 class Invitation(APIObject):
+    __slots__ = ('_user', '_id', '_share_name', '_inviter', '_permissions')
+
     def __init__(self, api, email, sid=None):
         super(Invitation, self).__init__(api)
 
         from .user import User
-        self._user = User(self.api, email)
+        self._user = shared(User, self.api, email)
 
         self._id = sid
         self._share_name = None
@@ -24,9 +27,8 @@ class Invitation(APIObject):
         self._id = json['share_id']
         self._share_name = json['share_name']
         from .user import User
-        self._inviter = User(self.api, json['invited_by'])
-        self._permissions = frozenset(
-            [Permission(p) for p in json['permissions']])
+        self._inviter = shared(User, self.api, json['invited_by'])
+        self._permissions = permission_set(json['permissions'])
         return self
 
     def load(self):
@@ -6,6 +6,8 @@ from .interface import readonly
 @readonly('inviter')
 @readonly('signup_code')
 class Invitee(APIObject):
+    __slots__ = ('_email', '_inviter', '_signup_code')
+
     def __init__(self, api, email):
         super(Invitee, self).__init__(api)
 
@@ -23,6 +25,9 @@ class Invitee(APIObject):
             return self.email != other.email
         return NotImplemented
 
+    def __hash__(self):
+        return hash(self._email)
+
     def from_json(self, json):
         self._email = json['email_to']
         from .user import User
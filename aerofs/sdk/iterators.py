@@ -0,0 +1,119 @@
+import collections
+import itertools
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    # import Queue for Python3
+    from queue import Empty, Full, Queue
+except ImportError:
+    # import Queue for Python2
+    from Queue import Empty, Full, Queue
+
+from .group import Group
+from .identity import shared
+from .user import User
+
+
+def _items(data, key):
+    if isinstance(data, list):
+        return data
+    return data.get('data', data.get(key, []))
+
+
+def prefetch(iterable, depth=1):
+    # Runs `iterable` on a worker thread, keeping up to `depth` items ready
+    # ahead of the consumer.
+    queue = Queue(maxsize=depth)
+    closed = threading.Event()
+    done = object()
+
+    def put(item):
+        while not closed.is_set():
+            try:
+                queue.put(item, timeout=0.1)
+                return True
+            except Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+            put((done, None))
+        except Exception as e:  # pylint: disable=W0703
+            put((None, e))
+
+    thread = threading.Thread(target=produce)
+    thread.daemon = True
+    thread.start()
+
+    try:
+        while True:
+            item, error = queue.get()
+            if error is not None:
+                raise error
+            if item is done:
+                return
+            yield item
+    finally:
+        closed.set()
+        try:
+            while True:
+                queue.get_nowait()
+        except Empty:
+            pass
+        thread.join()
+
+
+def _user_pages(api, page_size):
+    after = None
+    while True:
+        data = api.get_users(limit=page_size, after=after)
+        users = _items(data, 'users')
+        yield users
+
+        has_more = len(users) == page_size
+        if isinstance(data, dict):
+            has_more = data.get('has_more', has_more)
+        if not users or not has_more:
+            return
+        after = users[-1]['email']
+
+
+def iter_users(api, page_size=100, prefetch_pages=1):
+    for page in prefetch(_user_pages(api, page_size), prefetch_pages):
+        for data in page:
+            yield shared(User, api, data['email']).from_json(data)
+
+
+def _group_pages(api, page_size, workers):
+    # Pages are addressed by offset, so several are fetched at once; they
+    # are still yielded in order and at most `workers` are held in memory.
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        offsets = itertools.count(0, page_size)
+        pending = collections.deque(
+            pool.submit(api.get_groups, next(offsets), page_size)
+            for _ in range(workers))
+
+        try:
+            while pending:
+                groups = _items(pending.popleft().result(), 'groups')
+                yield groups
+
+                if len(groups) < page_size:
+                    return
+                pending.append(pool.submit(api.get_groups, next(offsets),
+                                           page_size))
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def iter_groups(api, page_size=100, workers=4):
+    for page in _group_pages(api, page_size, workers):
+        for data in page:
+            yield shared(Group, api, data['id']).from_json(data)
@@ -0,0 +1,142 @@
+import array
+import calendar
+import datetime
+import itertools
+import time
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+COLUMNS = ('id', 'name', 'is_folder', 'size', 'mime_type', 'last_modified')
+
+
+def _timestamp(value):
+    # Seconds since the epoch, 0 when unknown; accepts what the API returns
+    # (ISO 8601 in UTC), datetimes and numbers.
+    if not value:
+        return 0
+    if isinstance(value, datetime.datetime):
+        return calendar.timegm(value.utctimetuple())
+    if isinstance(value, (int, float)):
+        return value
+    return calendar.timegm(time.strptime(value[:19], '%Y-%m-%dT%H:%M:%S'))
+
+
+def _timestamps(values):
+    if numpy is None:
+        return array.array('d', [_timestamp(v) for v in values])
+
+    values = numpy.array([v[:19] if v else 'NaT' for v in values],
+                         dtype='datetime64[s]')
+    return numpy.where(numpy.isnat(values), 0,
+                       values.astype('int64')).astype('float64')
+
+
+# Read-only, column-oriented folder listing for scanning large folders: one
+# array per field instead of one File or Folder per entry. Columns are NumPy
+# arrays when NumPy is installed, arrays and lists otherwise. Filters take
+# masks (a boolean per entry) and return a new Listing:
+#
+#   big = listing.filter(listing.files(), listing.larger_than(2 ** 30))
+class Listing(object):
+    def __init__(self, columns):
+        self._columns = columns
+
+    @classmethod
+    def from_json(cls, json):
+        folders, files = json['folders'], json['files']
+        entries = list(itertools.chain(folders, files))
+
+        columns = {
+            'id': [e['id'] for e in entries],
+            'name': [e['name'] for e in entries],
+            'is_folder': [True] * len(folders) + [False] * len(files),
+            'size': [e.get('size', 0) for e in entries],
+            'mime_type': [e.get('mime_type', '') for e in entries],
+            'last_modified': _timestamps(
+                [e.get('last_modified') for e in entries]),
+        }
+
+        if numpy is None:
+            columns['is_folder'] = array.array('b', columns['is_folder'])
+            columns['size'] = array.array('q', columns['size'])
+        else:
+            for name in ('id', 'name', 'mime_type'):
+                columns[name] = numpy.array(columns[name], dtype=object)
+            columns['is_folder'] = numpy.array(columns['is_folder'],
+                                               dtype=bool)
+            columns['size'] = numpy.array(columns['size'], dtype='int64')
+        return cls(columns)
+
+    def __len__(self):
+        return len(self._columns['id'])
+
+    def __getitem__(self, column):
+        return self._columns[column]
+
+    def __iter__(self):
+        return zip(*[self._columns[name] for name in COLUMNS])
+
+    # masks
+
+    def _mask(self, column, predicate):
+        values = self._columns[column]
+        if numpy is None:
+            return [predicate(v) for v in values]
+        return predicate(values)
+
+    def files(self):
+        if numpy is None:
+            return [not v for v in self._columns['is_folder']]
+        return ~self._columns['is_folder']
+
+    def folders(self):
+        if numpy is None:
+            return [bool(v) for v in self._columns['is_folder']]
+        return self._columns['is_folder'].copy()
+
+    def larger_than(self, size):
+        return self._mask('size', lambda v: v > size)
+
+    def modified_since(self, when):
+        when = _timestamp(when)
+        return self._mask('last_modified', lambda v: v >= when)
+
+    # transformations
+
+    def filter(self, *masks):
+        if numpy is not None:
+            if not masks:
+                return self._select(numpy.arange(len(self)))
+            return self._select(numpy.flatnonzero(
+                numpy.logical_and.reduce(masks)))
+
+        return self._select([i for i, keep in enumerate(zip(*masks))
+                             if all(keep)] if masks else range(len(self)))
+
+    def sort(self, column, reverse=False):
+        values = self._columns[column]
+        if numpy is not None:
+            if not reverse:
+                return self._select(numpy.argsort(values, kind='stable'))
+            # Keep ties in their original order, as sorted() does.
+            order = numpy.argsort(values[::-1], kind='stable')
+            return self._select((len(values) - 1 - order)[::-1])
+
+        return self._select(sorted(range(len(values)),
+                                   key=values.__getitem__, reverse=reverse))
+
+    def _select(self, indices):
+        columns = {}
+        for name, values in self._columns.items():
+            if numpy is not None:
+                columns[name] = values[indices]
+            elif isinstance(values, array.array):
+                columns[name] = array.array(values.typecode,
+                                            [values[i] for i in indices])
+            else:
+                columns[name] = [values[i] for i in indices]
+        return Listing(columns)
@@ -0,0 +1,333 @@
+import collections
+import json
+import os
+import threading
+
+import requests
+from concurrent.futures import ThreadPoolExecutor
+
+from ..api import hashindex
+from ..api.atomic import write_json
+from .error import http_status
+from .folder import walk_listings
+
+
+MKDIR = 'mkdir'
+MOVE = 'move'
+UPLOAD = 'upload'
+DELETE = 'delete'
+RMDIR = 'rmdir'
+
+# Paths are relative to the mirrored roots and use '/'. `source` is the
+# previous path of a MOVE, None otherwise.
+Action = collections.namedtuple('Action', 'kind path source')
+
+# `error` is the exception that made the action fail, None on success.
+ActionResult = collections.namedtuple('ActionResult', 'action error')
+
+
+def _join(parent, name):
+    return '{}/{}'.format(parent, name) if parent else name
+
+
+def _split(path):
+    parent, _, name = path.rpartition('/')
+    return parent, name
+
+
+def _depth(path):
+    return path.count('/')
+
+
+def scan(root, exclude=()):
+    # Returns {path: (size, mtime)} for the files under `root` and the set of
+    # its subdirectories.
+    files, folders = {}, set()
+    for dirpath, _, filenames in os.walk(root):
+        parent = os.path.relpath(dirpath, root).replace(os.sep, '/')
+        parent = '' if parent == '.' else parent
+        if parent:
+            folders.add(parent)
+
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            if os.path.abspath(path) in exclude:
+                continue
+            st = os.stat(path)
+            files[_join(parent, name)] = (st.st_size, st.st_mtime)
+    return files, folders
+
+
+def plan(local_files, local_folders, files, folders, digest=None):
+    # Computes the actions turning the remote tree described by `files` and
+    # `folders` (as kept in the state) into the local one. A file that
+    # disappeared from one path and appeared at another with the same size
+    # and mtime is moved rather than uploaded again, provided `digest`, given
+    # the path of the local file, returns the digest recorded for the old
+    # one. Without `digest`, or in any doubt, the file is uploaded.
+    actions = [Action(MKDIR, path, None)
+               for path in sorted(set(local_folders) - set(folders),
+                                  key=lambda p: (_depth(p), p))]
+
+    gone = sorted(set(files) - set(local_files))
+    sources = collections.defaultdict(list)
+    for path in gone:
+        sources[(files[path]['size'], files[path]['mtime'])].append(path)
+
+    moved = set()
+    for path in sorted(local_files):
+        if path in files:
+            entry = files[path]
+            if (entry['size'], entry['mtime']) != local_files[path]:
+                actions.append(Action(UPLOAD, path, None))
+            continue
+
+        candidates = sources.get(local_files[path])
+        source = None
+        if candidates and digest is not None:
+            local = digest(path)
+            source = next((c for c in candidates
+                           if files[c].get('digest') == local), None)
+
+        if source:
+            candidates.remove(source)
+            moved.add(source)
+            actions.append(Action(MOVE, path, source))
+        else:
+            actions.append(Action(UPLOAD, path, None))
+
+    # Deleting a folder deletes its content: only the topmost are deleted.
+    removed = sorted(set(folders) - set(local_folders),
+                     key=lambda p: (_depth(p), p))
+    rmdirs = []
+    for path in removed:
+        if not any(path.startswith(r + '/') for r in rmdirs):
+            rmdirs.append(path)
+
+    for path in gone:
+        if path not in moved and \
+                not any(path.startswith(r + '/') for r in rmdirs):
+            actions.append(Action(DELETE, path, None))
+    actions.extend(Action(RMDIR, path, None) for path in rmdirs)
+    return actions
+
+
+# Mirrors a local directory into an AeroFS folder, one way: remote content
+# is made identical to the local tree, uploading new and modified files,
+# moving renamed ones and deleting what was removed.
+#
+# What was mirrored is kept in a small JSON state file (file ids, sizes,
+# mtimes, ETags and content digests), so that a run only compares the local
+# tree against it and transfers what changed locally. Uploads are conditioned
+# on the ETag recorded by the previous run. With `verify`, the remote tree is
+# listed first and anything changed remotely since the last run is corrected
+# too.
+#
+# `api` is used through the APIClient routes only, so it may be a client of
+# a test server or a fake.
+class Mirror(object):
+    def __init__(self, api, local_root, folder_id, state_path=None,
+                 workers=4):
+        self.api = api
+        self.local_root = local_root
+        self.folder_id = folder_id
+        self.state_path = state_path or '{}.aerofs-mirror.json'.format(
+            os.path.abspath(local_root).rstrip(os.sep))
+        self.workers = workers
+
+        self._lock = threading.Lock()
+        self._state = None
+        self._local_files = None
+
+    # state
+
+    def load_state(self):
+        try:
+            with open(self.state_path, 'r') as f:
+                state = json.load(f)
+            if state.get('folder_id') == self.folder_id:
+                return state
+        except (IOError, OSError, ValueError):
+            pass
+        return {'folder_id': self.folder_id, 'folders': {}, 'files': {}}
+
+    def save_state(self):
+        with self._lock:
+            write_json(self.state_path, self._state)
+
+    def _verify(self, state):
+        # Replaces the state with the remote tree, keeping what is known of
+        # the files that did not change remotely.
+        folders, files = {}, {}
+        paths = {self.folder_id: ''}
+        for folder, data in walk_listings(self.api, self.folder_id,
+                                          workers=self.workers):
+            parent = paths[folder['id']]
+            for subfolder in data['folders']:
+                paths[subfolder['id']] = _join(parent, subfolder['name'])
+                folders[paths[subfolder['id']]] = subfolder['id']
+
+            for child in data['files']:
+                path = _join(parent, child['name'])
+                entry = state['files'].get(path)
+                if not entry or entry['id'] != child['id'] or \
+                        entry.get('remote_size') != child.get('size') or \
+                        entry.get('last_modified') != \
+                        child.get('last_modified'):
+                    entry = {'id': child['id'], 'size': None, 'mtime': None,
+                             'etag': None, 'digest': None}
+                files[path] = entry
+
+        state['folders'], state['files'] = folders, files
+        return state
+
+    # planning
+
+    def plan(self, verify=False):
+        self._state = self.load_state()
+        if verify:
+            self._state = self._verify(self._state)
+
+        local_files, local_folders = scan(
+            self.local_root, exclude=(os.path.abspath(self.state_path),))
+        self._local_files = local_files
+        return plan(local_files, local_folders, self._state['files'],
+                    self._state['folders'], digest=self._digest)
+
+    def _digest(self, path):
+        with open(self._path(path), 'rb') as f:
+            return hashindex.digest(f)
+
+    # execution
+
+    def run(self, verify=False, dry_run=False):
+        # Plans and, unless `dry_run`, applies the actions; uploads run
+        # `workers` at a time. Returns an ActionResult per action.
+        actions = self.plan(verify)
+        if dry_run:
+            return [ActionResult(action, None) for action in actions]
+
+        groups = collections.OrderedDict(
+            (kind, []) for kind in (MKDIR, MOVE, UPLOAD, DELETE, RMDIR))
+        for action in actions:
+            groups[action.kind].append(action)
+
+        results = []
+        try:
+            # Parents before children.
+            results.extend(self._attempt(a) for a in groups[MKDIR])
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                for kind in (MOVE, UPLOAD, DELETE, RMDIR):
+                    results.extend(pool.map(self._attempt, groups[kind]))
+        finally:
+            self.save_state()
+        return results
+
+    def _attempt(self, action):
+        try:
+            getattr(self, '_{}'.format(action.kind))(action)
+        except Exception as e:  # pylint: disable=W0703
+            return ActionResult(action, e)
+        return ActionResult(action, None)
+
+    def _path(self, path):
+        return os.path.join(self.local_root, *path.split('/'))
+
+    def _parent_id(self, path):
+        parent, name = _split(path)
+        if not parent:
+            return self.folder_id, name
+        with self._lock:
+            return self._state['folders'][parent], name
+
+    def _find(self, parent_id, name, key):
+        # The id of an entry created remotely but missing from the state.
+        children = self.api.get_folder_children(parent_id)
+        for child in children[key]:
+            if child['name'] == name:
+                return child['id']
+        raise LookupError('{} not found.'.format(name))
+
+    def _mkdir(self, action):
+        parent_id, name = self._parent_id(action.path)
+        try:
+            folder_id = self.api.create_folder(parent_id, name)['id']
+        except requests.exceptions.HTTPError as e:
+            if http_status(e) != 409:
+                raise
+            folder_id = self._find(parent_id, name, 'folders')
+
+        with self._lock:
+            self._state['folders'][action.path] = folder_id
+
+    def _move(self, action):
+        parent_id, name = self._parent_id(action.path)
+        with self._lock:
+            entry = self._state['files'][action.source]
+
+        self.api.move_file(entry['id'], parent_id, name)
+        etag = self.api.metadata.etag
+        with self._lock:
+            entry = self._state['files'].pop(action.source)
+            if etag:
+                entry['etag'] = etag
+            self._state['files'][action.path] = entry
+
+    def _upload(self, action):
+        parent_id, name = self._parent_id(action.path)
+        with self._lock:
+            entry = dict(self._state['files'].get(action.path) or {})
+
+        if not entry:
+            try:
+                entry['id'] = self.api.create_file(parent_id, name)['id']
+            except requests.exceptions.HTTPError as e:
+                if http_status(e) != 409:
+                    raise
+                entry['id'] = self._find(parent_id, name, 'files')
+
+        size, mtime = self._local_files[action.path]
+        with open(self._path(action.path), 'rb') as f:
+            digest = hashindex.digest(f)
+            self.api.upload_file_content(
+                entry['id'], f,
+                ifmatch=[entry['etag']] if entry.get('etag') else None)
+
+        data = self.api.get_file(entry['id'])
+        entry.update(size=size, mtime=mtime, etag=self.api.metadata.etag,
+                     digest=digest,
+                     remote_size=data.get('size'),
+                     last_modified=data.get('last_modified'))
+        with self._lock:
+            self._state['files'][action.path] = entry
+
+    def _delete(self, action):
+        with self._lock:
+            entry = self._state['files'][action.path]
+
+        try:
+            self.api.delete_file(entry['id'])
+        except requests.exceptions.HTTPError as e:
+            if http_status(e) != 404:
+                raise
+
+        with self._lock:
+            self._state['files'].pop(action.path, None)
+
+    def _rmdir(self, action):
+        with self._lock:
+            folder_id = self._state['folders'][action.path]
+
+        try:
+            self.api.delete_folder(folder_id)
+        except requests.exceptions.HTTPError as e:
+            if http_status(e) != 404:
+                raise
+
+        prefix = action.path + '/'
+        with self._lock:
+            for key in ('folders', 'files'):
+                entries = self._state[key]
+                for path in [p for p in entries
+                             if p == action.path or p.startswith(prefix)]:
+                    del entries[path]
@@ -0,0 +1,106 @@
+import collections
+import csv
+
+import requests
+from concurrent.futures import FIRST_COMPLETED
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+
+from .error import http_status
+
+
+CREATED = 'created'
+EXISTING = 'existing'
+FAILED = 'failed'
+
+
+class UserRecord(collections.namedtuple(
+        'UserRecord', 'email first_name last_name password groups')):
+    def __new__(cls, email, first_name, last_name, password=None, groups=()):
+        return super(UserRecord, cls).__new__(cls, email, first_name,
+                                              last_name, password,
+                                              tuple(groups))
+
+
+# `error` is the exception that stopped the record when `status` is FAILED.
+ProvisionResult = collections.namedtuple('ProvisionResult',
+                                         'record status error')
+
+
+def read_csv(f):
+    # Reads records from a CSV file with a header row naming the columns
+    # email, first_name and last_name, and optionally password and groups
+    # (group ids separated by ';').
+    for row in csv.DictReader(f):
+        yield UserRecord(row['email'].strip(), row['first_name'],
+                         row['last_name'], row.get('password') or None,
+                         [g for g in (row.get('groups') or '').split(';')
+                          if g.strip()])
+
+
+def _exists(api, email):
+    try:
+        api.get_user(email)
+    except requests.exceptions.HTTPError as e:
+        if http_status(e) == 404:
+            return False
+        raise
+    return True
+
+
+def provision_user(api, record, update_existing=False):
+    # Creates the user unless it already exists, sets its password and adds
+    # it to its groups. The password of a user that already exists is only
+    # reset when `update_existing` is set; group memberships are always
+    # applied, so a failed run can simply be repeated.
+    status = CREATED
+    if _exists(api, record.email):
+        status = EXISTING
+    else:
+        try:
+            api.create_user(record.email, record.first_name,
+                            record.last_name)
+        except requests.exceptions.HTTPError as e:
+            if http_status(e) != 409:  # created concurrently
+                raise
+            status = EXISTING
+
+    if record.password and (status == CREATED or update_existing):
+        api.update_user_password(record.email, record.password)
+
+    for group in record.groups:
+        try:
+            api.add_group_member(group, record.email)
+        except requests.exceptions.HTTPError as e:
+            if http_status(e) != 409:  # already a member
+                raise
+    return status
+
+
+def provision_users(api, records, workers=8, update_existing=False):
+    # Provisions `records` (UserRecords, e.g. from read_csv) with up to
+    # `workers` at a time, yielding a ProvisionResult for each as it
+    # completes. Records are read as workers free up, so `records` may be a
+    # stream of any length.
+    records = iter(records)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        running = {}
+        exhausted = False
+        while running or not exhausted:
+            while not exhausted and len(running) < workers:
+                try:
+                    record = next(records)
+                except StopIteration:
+                    exhausted = True
+                    break
+                running[pool.submit(provision_user, api, record,
+                                    update_existing)] = record
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                record = running.pop(future)
+                error = future.exception()
+                if error is not None:
+                    yield ProvisionResult(record, FAILED, error)
+                else:
+                    yield ProvisionResult(record, future.result(), None)
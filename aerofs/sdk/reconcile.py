@@ -0,0 +1,152 @@
+import collections
+
+from concurrent.futures import ThreadPoolExecutor
+
+from .common import Permission
+from .error import ConflictException
+
+
+ADD = 'add'
+UPDATE = 'update'
+REMOVE = 'remove'
+
+MEMBER = 'member'
+GROUP = 'group'
+PENDING = 'pending'
+
+
+# Desired access to one share: emails and group ids mapped to their
+# permissions (e.g. ['WRITE', 'MANAGE'], or [] for viewers).
+class ShareACL(collections.namedtuple('ShareACL', 'members groups')):
+    def __new__(cls, members=None, groups=None):
+        return super(ShareACL, cls).__new__(cls, dict(members or {}),
+                                            dict(groups or {}))
+
+# One call needed to bring a share to its desired state; `previous` holds
+# the permissions read when planning, None for additions.
+Change = collections.namedtuple(
+    'Change', 'share_id kind subject action permissions previous')
+
+# `error` is the exception that made the change fail, None on success.
+ChangeResult = collections.namedtuple('ChangeResult', 'change error')
+
+
+def _permissions(permissions):
+    return frozenset([Permission(p).value for p in permissions])
+
+
+def _diff(share_id, kind, current, desired, remove):
+    changes = []
+    for subject, permissions in sorted(desired.items()):
+        if subject not in current:
+            changes.append(Change(share_id, kind, subject, ADD, permissions,
+                                  None))
+        elif current[subject] != permissions:
+            changes.append(Change(share_id, kind, subject, UPDATE,
+                                  permissions, current[subject]))
+    if remove:
+        for subject in sorted(set(current) - set(desired)):
+            changes.append(Change(share_id, kind, subject, REMOVE, None,
+                                  current[subject]))
+    return changes
+
+
+# Brings the members and groups of many shares to a desired state with as
+# few calls as possible. Shares are read concurrently, with conditional GETs
+# when the client has a ResponseCache, and only entries that differ are
+# changed. Member updates and removals are made with If-Match, after
+# checking that the member still has the permissions seen when planning.
+#
+# Members missing from the desired state are removed, and pending
+# invitations for them withdrawn, unless `remove` is False. Emails with a
+# pending invitation count as present.
+class ACLReconciler(object):
+    def __init__(self, api, workers=8, remove=True):
+        self.api = api
+        self.workers = workers
+        self.remove = remove
+
+    def plan(self, desired):
+        # Returns the Changes needed for `desired`, a dict of share ids to
+        # ShareACLs, without making them: a dry run.
+        share_ids = sorted(desired)
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            shares = list(pool.map(self.api.get_shared_folder, share_ids))
+
+        changes = []
+        for share_id, share in zip(share_ids, shares):
+            changes.extend(self.diff(share_id, share, desired[share_id]))
+        return changes
+
+    def diff(self, share_id, share, acl):
+        members = {m['email']: _permissions(m['permissions'])
+                   for m in share['members']}
+        pending = {m['email']: _permissions(m['permissions'])
+                   for m in share['pending']}
+        groups = {g['id']: _permissions(g['permissions'])
+                  for g in share['groups']}
+
+        wanted = {email: _permissions(p) for email, p in acl.members.items()}
+        changes = _diff(share_id, MEMBER, members,
+                        {email: p for email, p in wanted.items()
+                         if email not in pending}, self.remove)
+        if self.remove:
+            changes.extend(
+                Change(share_id, PENDING, email, REMOVE, None, p)
+                for email, p in sorted(pending.items())
+                if email not in wanted)
+
+        changes.extend(_diff(share_id, GROUP, groups,
+                             {gid: _permissions(p)
+                              for gid, p in acl.groups.items()},
+                             self.remove))
+        return changes
+
+    def apply(self, changes):
+        # Makes `changes` concurrently; returns a ChangeResult for each, in
+        # order.
+        def run(change):
+            try:
+                self._apply(change)
+            except Exception as e:  # pylint: disable=W0703
+                return ChangeResult(change, e)
+            return ChangeResult(change, None)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            return list(pool.map(run, changes))
+
+    def reconcile(self, desired, dry_run=False):
+        changes = self.plan(desired)
+        if dry_run:
+            return [ChangeResult(change, None) for change in changes]
+        return self.apply(changes)
+
+    def _apply(self, change):
+        api = self.api
+        share_id, subject = change.share_id, change.subject
+        permissions = sorted(change.permissions or [])
+
+        if change.kind == PENDING:
+            api.remove_sf_pending_member(share_id, subject)
+        elif change.kind == GROUP:
+            if change.action == ADD:
+                api.add_sf_group_member(share_id, subject, permissions)
+            elif change.action == UPDATE:
+                api.update_sf_group_member(share_id, subject, permissions)
+            else:
+                api.remove_sf_group_member(share_id, subject)
+        elif change.action == ADD:
+            api.add_sf_member(share_id, subject, permissions)
+        else:
+            member = api.get_sf_member(share_id, subject)
+            ifmatch = [api.metadata.etag] if api.metadata.etag else None
+            if _permissions(member['permissions']) != change.previous:
+                raise ConflictException(
+                    '{} changed on share {} since planning.'.format(
+                        subject, share_id))
+
+            if change.action == UPDATE:
+                api.update_sf_member(share_id, subject, permissions,
+                                     ifmatch=ifmatch)
+            else:
+                api.remove_sf_member(share_id, subject, ifmatch=ifmatch)
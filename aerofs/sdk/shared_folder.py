@@ -1,4 +1,4 @@
-from .common import Permission
+from .common import permission_set
 from .interface import APIObject
 from .interface import readonly
 
@@ -11,6 +11,9 @@ from .interface import readonly
 @readonly('pending')
 @readonly('caller_permissions')
 class SharedFolder(APIObject):
+    __slots__ = ('_id', '_name', '_is_external', '_members', '_groups',
+                 '_pending', '_caller_permissions')
+
     def __init__(self, api, sid=None):
         super(SharedFolder, self).__init__(api)
 
@@ -38,8 +41,8 @@ class SharedFolder(APIObject):
         self._pending = frozenset(
             [SFPendingMember(self.api, self.id).from_json(f)
              for f in json['pending']])
-        self._caller_permissions = frozenset(
-            [Permission(p) for p in json['caller_effective_permissions']])
+        self._caller_permissions = permission_set(
+            json['caller_effective_permissions'])
         return self
 
     def load(self):
@@ -1,4 +1,5 @@
-from .common import Permission
+from .common import permission_set
+from .identity import shared
 from .interface import APIObject
 from .interface import readonly
 from .interface import synced
@@ -9,11 +10,13 @@ from .interface import synced
 @readonly('name')
 @synced('permissions')
 class SFGroupMember(APIObject):
+    __slots__ = ('_shared_folder', '_id', '_name', '_permissions')
+
     def __init__(self, api, sid, gid=None):
         super(SFGroupMember, self).__init__(api)
 
         from .shared_folder import SharedFolder
-        self._shared_folder = SharedFolder(self.api, sid)
+        self._shared_folder = shared(SharedFolder, self.api, sid)
 
         self._id = gid
         self._name = None
@@ -22,8 +25,7 @@ class SFGroupMember(APIObject):
     def from_json(self, json):
         self._id = json['id']
         self._name = json['name']
-        self._permissions = frozenset(
-            [Permission(p) for p in json['permissions']])
+        self._permissions = permission_set(json['permissions'])
         return self
 
     def load(self):
@@ -1,4 +1,5 @@
-from .common import Permission
+from .common import permission_set
+from .identity import shared
 from .interface import APIObject
 from .interface import enable_etags
 from .interface import readonly
@@ -11,11 +12,14 @@ from .interface import synced
 @readonly('last_name')
 @synced('permissions')
 class SFMember(APIObject):
+    __slots__ = ('_shared_folder', '_email', '_first_name', '_last_name',
+                 '_permissions')
+
     def __init__(self, api, sid, email=None):
         super(SFMember, self).__init__(api)
 
         from .shared_folder import SharedFolder
-        self._shared_folder = SharedFolder(self.api, sid)
+        self._shared_folder = shared(SharedFolder, self.api, sid)
 
         self._email = email
         self._first_name = None
@@ -35,14 +39,13 @@ class SFMember(APIObject):
         return NotImplemented
 
     def __hash__(self):
-        return hash(tuple(sorted(self.__dict__.items())))
+        return hash((self._shared_folder._id, self._email))
 
     def from_json(self, json):
         self._email = json['email']
         self._first_name = json['first_name']
         self._last_name = json['last_name']
-        self._permissions = frozenset(
-            [Permission(p) for p in json['permissions']])
+        self._permissions = permission_set(json['permissions'])
         return self
 
     @enable_etags
@@ -1,19 +1,23 @@
-from .common import Permission
+from .common import permission_set
+from .identity import shared
 from .interface import APIObject
 from .interface import readonly
 
 
 @readonly('shared_folder', sync=False)
-@readonly('id', sync=False)
+@readonly('email', sync=False)
 @readonly('first_name')
 @readonly('last_name')
 @readonly('permissions')
 class SFPendingMember(APIObject):
+    __slots__ = ('_shared_folder', '_email', '_inviter', '_first_name',
+                 '_last_name', '_permissions')
+
     def __init__(self, api, sid, email=None):
         super(SFPendingMember, self).__init__(api)
 
         from .shared_folder import SharedFolder
-        self._shared_folder = SharedFolder(self.api, sid)
+        self._shared_folder = shared(SharedFolder, self.api, sid)
 
         self._email = email
         self._inviter = None
@@ -34,15 +38,14 @@ class SFPendingMember(APIObject):
         return NotImplemented
 
     def __hash__(self):
-        return hash(tuple(sorted(self.__dict__.items())))
+        return hash((self._shared_folder._id, self._email))
 
     def from_json(self, json):
         self._email = json['email']
         self._first_name = json.get('first_name')  # present only for accounts
         self._last_name = json.get('last_name')  # present only for accounts
         self._inviter = json['invited_by']
-        self._permissions = frozenset(
-            [Permission(p) for p in json['permissions']])
+        self._permissions = permission_set(json['permissions'])
         return self
 
     def load(self):
@@ -0,0 +1,94 @@
+import collections
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+
+
+_local = threading.local()
+
+
+def active_unit():
+    units = getattr(_local, 'units', None)
+    return units[-1] if units else None
+
+
+# Defers writes to synced fields made by the current thread inside a `with`
+# block: assignments only update the object and mark it dirty. On commit,
+# which happens when the block exits without error, each dirty object is
+# saved once per distinct saver (e.g. a single update_user for both names, a
+# single move for name and parent), up to `workers` objects at a time. If the
+# block raises, the assigned fields are restored and nothing is sent.
+#
+# Objects whose save failed stay pending, so commit() can be called again;
+# the first failure is re-raised.
+class UnitOfWork(object):
+    def __init__(self, workers=8):
+        self.workers = workers
+
+        self._dirty = collections.OrderedDict()  # id(o): (o, savers, values)
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        _local.__dict__.setdefault('units', []).append(self)
+        return self
+
+    def __exit__(self, kind, _, __):
+        _local.units.pop()
+        if kind is None:
+            self.commit()
+        else:
+            self.rollback()
+
+    @property
+    def pending(self):
+        with self._lock:
+            return [o for o, _, _ in self._dirty.values()]
+
+    def defer(self, o, slot, value, saver):
+        with self._lock:
+            entry = self._dirty.get(id(o))
+            if entry is None:
+                entry = self._dirty[id(o)] = (o, [], {})
+
+            _, savers, originals = entry
+            if saver not in savers:
+                savers.append(saver)
+            if slot not in originals:
+                originals[slot] = getattr(o, slot)
+
+        setattr(o, slot, value)
+
+    def rollback(self):
+        with self._lock:
+            entries = list(self._dirty.values())
+            self._dirty.clear()
+
+        for o, _, originals in entries:
+            for slot, value in originals.items():
+                setattr(o, slot, value)
+
+    def commit(self):
+        with self._lock:
+            entries = list(self._dirty.values())
+        if not entries:
+            return
+
+        def save(entry):
+            o, savers, _ = entry
+            for saver in savers:
+                saver(o)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = [(entry[0], pool.submit(save, entry))
+                       for entry in entries]
+
+        errors = []
+        for o, future in futures:
+            if future.exception() is not None:
+                errors.append(future.exception())
+                continue
+            with self._lock:
+                self._dirty.pop(id(o), None)
+
+        if errors:
+            raise errors[0]
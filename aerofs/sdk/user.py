@@ -1,4 +1,6 @@
 from .error import NoRouteException
+from .identity import identity_map
+from .identity import shared
 from .interface import APIObject
 from .interface import readonly
 from .interface import synced
@@ -14,6 +16,9 @@ from .interface import writeonly
 @synced('two_factor')
 @readonly('devices')
 class User(APIObject):
+    __slots__ = ('_email', '_first_name', '_last_name', '_shares',
+                 '_invitations', '_password', '_two_factor', '_devices')
+
     def __init__(self, api, email):
         super(User, self).__init__(api)
 
@@ -37,15 +42,16 @@ class User(APIObject):
         return NotImplemented
 
     def __hash__(self):
-        return hash(tuple(sorted(self.__dict__.items())))
+        return hash(self._email)
 
     def from_json(self, json):
         self._first_name = json['first_name']
         self._last_name = json['last_name']
         if 'shares' in json:  # requires extra scopes
             from .shared_folder import SharedFolder
-            self._shares = frozenset([SharedFolder(self.api).from_json(f)
-                                      for f in json['shares']])
+            self._shares = frozenset(
+                [shared(SharedFolder, self.api, f['id']).from_json(f)
+                 for f in json['shares']])
         if 'invitations' in json:  # requires extra scopes
             from .invitation import Invitation
             self._invitations = frozenset(
@@ -60,18 +66,18 @@ class User(APIObject):
     def load_devices(self):
         data = self.api.get_devices(self.email)
         from .device import Device
-        self._devices = frozenset([Device(self.api).from_json(d)
-                                   for d in data])
+        self._devices = frozenset(
+            [shared(Device, self.api, d['id']).from_json(d) for d in data])
 
     def load_two_factor(self):
         data = self.api.get_user_twofactor(self.email)
         self._two_factor = data['enforce']
 
-    def save_first_name(self):
+    def save_names(self):
         self.api.update_user(self.email, self._first_name, self._last_name)
 
-    def save_last_name(self):
-        self.api.update_user(self.email, self._first_name, self._last_name)
+    save_first_name = save_names
+    save_last_name = save_names
 
     def save_password(self):
         password = self._password
@@ -98,3 +104,4 @@ class User(APIObject):
 
     def delete(self):
         self.api.delete_user(self.email)
+        identity_map(self.api).invalidate(User, self.email)
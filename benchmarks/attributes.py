@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+"""Cost of reading attributes of loaded SDK objects.
+
+Times reads of already loaded fields of a File, which never reach the API,
+next to a read of the underlying slot as a baseline.
+
+    $ python benchmarks/attributes.py --number 1000000
+
+Run it against two checkouts to compare them. Requires Python 3.5+.
+"""
+from __future__ import print_function
+
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from aerofs.sdk.file import File  # noqa: E402
+
+
+class NoAPI(object):
+    pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--number', type=int, default=1000000)
+    args = parser.parse_args()
+
+    f = File(NoAPI(), 'a' * 32).from_json({
+        'id': 'a' * 32,
+        'name': 'file.txt',
+        'parent': 'b' * 32,
+        'last_modified': '2016-01-01T00:00:00Z',
+        'size': 1024,
+        'mime_type': 'text/plain',
+    })
+
+    for name, statement in (('slot', 'f._name'),
+                            ('readonly', 'f.id'),
+                            ('readonly sync', 'f.size'),
+                            ('synced', 'f.name')):
+        elapsed = min(timeit.repeat(statement, globals={'f': f}, repeat=5,
+                                    number=args.number))
+        print('{:<16} {:>8.1f} ns'.format(name,
+                                          elapsed / args.number * 1e9))
+
+
+if __name__ == '__main__':
+    main()
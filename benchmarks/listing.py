@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+"""Memory and CPU cost of large folder and shared folder listings.
+
+Builds the SDK objects (and a columnar Listing) for a folder of N entries
+and a shared folder of N members from canned JSON, without any network
+access, and reports the time taken and the memory held by the result.
+
+    $ python benchmarks/listing.py --entries 100000
+
+Run it against two checkouts to compare them. Requires Python 3.4+
+(tracemalloc).
+"""
+from __future__ import print_function
+
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from aerofs.sdk.folder import Children  # noqa: E402
+from aerofs.sdk.listing import Listing  # noqa: E402
+from aerofs.sdk.shared_folder import SharedFolder  # noqa: E402
+
+
+class NoAPI(object):
+    pass
+
+
+def children_json(n):
+    return {
+        'files': [{
+            'id': '{:032x}{:08x}'.format(i, i),
+            'name': 'file-{}.txt'.format(i),
+            'last_modified': '2016-01-01T00:00:00Z',
+            'size': i,
+            'mime_type': 'text/plain',
+        } for i in range(n)],
+        'folders': [{
+            'id': '{:032x}'.format(i),
+            'name': 'folder-{}'.format(i),
+            'is_shared': False,
+        } for i in range(n // 10)],
+    }
+
+
+def shared_folder_json(n):
+    return {
+        'id': 'a' * 32,
+        'name': 'share',
+        'is_external': False,
+        'members': [{
+            'email': 'user{}@example.com'.format(i),
+            'first_name': 'First',
+            'last_name': 'Last',
+            'permissions': ['WRITE', 'MANAGE'] if i % 2 else ['WRITE'],
+        } for i in range(n)],
+        'groups': [],
+        'pending': [],
+        'caller_effective_permissions': ['WRITE', 'MANAGE'],
+    }
+
+
+def measure(name, build):
+    gc.collect()
+    tracemalloc.start()
+    start = time.time()
+    result = build()
+    elapsed = time.time() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print('{:<16} {:>8.3f} s {:>10.1f} MiB'.format(name, elapsed,
+                                                   size / 2.0 ** 20))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--entries', type=int, default=100000)
+    args = parser.parse_args()
+
+    api = NoAPI()
+    listing = children_json(args.entries)
+    members = shared_folder_json(args.entries)
+
+    measure('children', lambda: Children(api, 'root').from_json(listing))
+    columns = measure('listing', lambda: Listing.from_json(listing))
+    measure('listing filter', lambda: columns.filter(
+        columns.files(), columns.larger_than(args.entries // 2)).sort('size'))
+    measure('members',
+            lambda: SharedFolder(api, 'a' * 32).from_json(members))
+
+
+if __name__ == '__main__':
+    main()
@@ -18,6 +18,10 @@ setuptools.setup(
     url='https://github.com/aerofs/aerofs-sdk-python',
     packages=setuptools.find_packages(exclude=['tests']),
     install_requires=requirements,
+    extras_require={
+        'async': ['aiohttp>=3.0; python_version >= "3.7"'],
+        'http2': ['httpx[http2]; python_version >= "3.6"'],
+    },
     classifiers=[
         'Development Status :: 5 - Production/Stable',
         'Intended Audience :: Developers',
@@ -0,0 +1,218 @@
+import itertools
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+import requests
+
+from aerofs.sdk import Mirror
+from aerofs.sdk.mirror import DELETE
+from aerofs.sdk.mirror import MKDIR
+from aerofs.sdk.mirror import MOVE
+from aerofs.sdk.mirror import RMDIR
+from aerofs.sdk.mirror import UPLOAD
+
+
+def http_error(status):
+    response = requests.Response()
+    response.status_code = status
+    return requests.exceptions.HTTPError(str(status), response=response)
+
+
+class FakeMetadata(object):
+    def __init__(self, local):
+        self._local = local
+
+    @property
+    def etag(self):
+        return getattr(self._local, 'etag', None)
+
+
+# In-memory stand-in for the APIClient routes used by Mirror.
+class FakeAPI(object):
+    def __init__(self):
+        self.nodes = {'root': {'folder': True, 'name': '', 'parent': None}}
+        self.calls = []
+
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.metadata = FakeMetadata(self._local)
+
+    def _etag(self, node_id):
+        return '"{}-{}"'.format(node_id, self.nodes[node_id]['version'])
+
+    def _create(self, parent, name, folder):
+        with self._lock:
+            for node in self.nodes.values():
+                if node['parent'] == parent and node['name'] == name:
+                    raise http_error(409)
+            node_id = 'id{}'.format(next(self._ids))
+            self.nodes[node_id] = {'folder': folder, 'name': name,
+                                   'parent': parent, 'content': b'',
+                                   'version': 0}
+        return {'id': node_id, 'name': name}
+
+    def create_folder(self, parent, name):
+        return self._create(parent, name, True)
+
+    def create_file(self, parent, name):
+        return self._create(parent, name, False)
+
+    def get_file(self, file_id):
+        node = self.nodes[file_id]
+        self._local.etag = self._etag(file_id)
+        return {'id': file_id, 'name': node['name'],
+                'size': len(node['content']),
+                'last_modified': str(node['version'])}
+
+    def get_folder_children(self, folder_id):
+        children = {'folders': [], 'files': []}
+        for node_id, node in sorted(self.nodes.items()):
+            if node['parent'] != folder_id:
+                continue
+            if node['folder']:
+                children['folders'].append({'id': node_id,
+                                            'name': node['name']})
+            else:
+                children['files'].append(self.get_file(node_id))
+        return children
+
+    def upload_file_content(self, file_id, stream, ifmatch=None):
+        if ifmatch and self._etag(file_id) not in ifmatch:
+            raise http_error(412)
+        self.nodes[file_id]['content'] = stream.read()
+        self.nodes[file_id]['version'] += 1
+        self.calls.append((UPLOAD, file_id))
+
+    def move_file(self, file_id, parent, name, ifmatch=None):
+        self.nodes[file_id].update(parent=parent, name=name)
+        self._local.etag = self._etag(file_id)
+        self.calls.append((MOVE, file_id))
+
+    def delete_file(self, file_id, ifmatch=None):
+        if file_id not in self.nodes:
+            raise http_error(404)
+        del self.nodes[file_id]
+        self.calls.append((DELETE, file_id))
+
+    def delete_folder(self, folder_id, ifmatch=None):
+        def remove(node_id):
+            for child in [k for k, node in self.nodes.items()
+                          if node['parent'] == node_id]:
+                remove(child)
+            del self.nodes[node_id]
+
+        remove(folder_id)
+        self.calls.append((RMDIR, folder_id))
+
+    def tree(self, parent='root', prefix=''):
+        # {path: content} of files, {path: None} of folders.
+        tree = {}
+        for node_id, node in self.nodes.items():
+            if node['parent'] != parent:
+                continue
+            path = prefix + node['name']
+            if node['folder']:
+                tree[path] = None
+                tree.update(self.tree(node_id, path + '/'))
+            else:
+                tree[path] = node['content']
+        return tree
+
+
+class MirrorTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.root = os.path.join(self.directory, 'root')
+        os.makedirs(os.path.join(self.root, 'a', 'b'))
+        self.write('x.txt', b'x')
+        self.write('a/y.txt', b'yy')
+        self.write('a/b/z.txt', b'zzz')
+
+        self.api = FakeAPI()
+        self.mirror = Mirror(self.api, self.root, 'root', workers=2)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def path(self, path):
+        return os.path.join(self.root, *path.split('/'))
+
+    def write(self, path, content, mtime=None):
+        with open(self.path(path), 'wb') as f:
+            f.write(content)
+        if mtime is not None:
+            os.utime(self.path(path), (mtime, mtime))
+
+    def run_mirror(self, verify=False):
+        results = self.mirror.run(verify=verify)
+        for result in results:
+            self.assertIsNone(result.error)
+        return sorted((r.action.kind, r.action.path) for r in results)
+
+    def test_create(self):
+        self.assertEqual(self.run_mirror(), [
+            (MKDIR, 'a'), (MKDIR, 'a/b'), (UPLOAD, 'a/b/z.txt'),
+            (UPLOAD, 'a/y.txt'), (UPLOAD, 'x.txt')])
+        self.assertEqual(self.api.tree(), {
+            'a': None, 'a/b': None, 'a/b/z.txt': b'zzz', 'a/y.txt': b'yy',
+            'x.txt': b'x'})
+        self.assertEqual(self.run_mirror(), [])
+
+    def test_modify(self):
+        self.run_mirror()
+        mtime = os.stat(self.path('x.txt')).st_mtime
+        self.write('x.txt', b'x2', mtime + 10)
+
+        self.assertEqual(self.run_mirror(), [(UPLOAD, 'x.txt')])
+        self.assertEqual(self.api.tree()['x.txt'], b'x2')
+
+    def test_move(self):
+        self.run_mirror()
+        os.rename(self.path('a/y.txt'), self.path('y.txt'))
+        del self.api.calls[:]
+
+        self.assertEqual(self.run_mirror(), [(MOVE, 'y.txt')])
+        self.assertEqual([kind for kind, _ in self.api.calls], [MOVE])
+        self.assertEqual(self.api.tree()['y.txt'], b'yy')
+        self.assertNotIn('a/y.txt', self.api.tree())
+
+    def test_same_size_and_mtime_is_not_a_move(self):
+        self.run_mirror()
+        mtime = os.stat(self.path('a/y.txt')).st_mtime
+        os.remove(self.path('a/y.txt'))
+        self.write('w.txt', b'ww', mtime)
+
+        self.assertEqual(self.run_mirror(), [(DELETE, 'a/y.txt'),
+                                             (UPLOAD, 'w.txt')])
+        self.assertEqual(self.api.tree()['w.txt'], b'ww')
+
+    def test_verify(self):
+        self.run_mirror()
+        file_id = self.mirror._state['files']['a/y.txt']['id']
+        self.api.nodes[file_id].update(content=b'remote', version=5)
+        folder_id = self.mirror._state['folders']['a/b']
+        self.api.delete_folder(folder_id)
+
+        self.assertEqual(self.run_mirror(), [])
+        self.assertEqual(self.run_mirror(verify=True), [
+            (MKDIR, 'a/b'), (UPLOAD, 'a/b/z.txt'), (UPLOAD, 'a/y.txt')])
+        self.assertEqual(self.api.tree(), {
+            'a': None, 'a/b': None, 'a/b/z.txt': b'zzz', 'a/y.txt': b'yy',
+            'x.txt': b'x'})
+
+    def test_delete(self):
+        self.run_mirror()
+        os.remove(self.path('x.txt'))
+        shutil.rmtree(self.path('a/b'))
+
+        self.assertEqual(self.run_mirror(), [(DELETE, 'x.txt'),
+                                             (RMDIR, 'a/b')])
+        self.assertEqual(self.api.tree(), {'a': None, 'a/y.txt': b'yy'})
+
+
+if __name__ == '__main__':
+    unittest.main()
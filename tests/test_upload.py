@@ -0,0 +1,123 @@
+import io
+import itertools
+import json
+import shutil
+import tempfile
+import unittest
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from aerofs.api import APIClient
+from aerofs.api import InstanceConfiguration
+from aerofs.api import UploadCheckpointStore
+
+
+def response(status, headers=None, data=None):
+    res = requests.Response()
+    res.status_code = status
+    res.headers = CaseInsensitiveDict(headers or {})
+    res._content = json.dumps(data).encode('utf-8') if data else b''
+    return res
+
+
+# In-memory stand-in for the chunked upload routes of one file.
+class FakeTransport(object):
+    def __init__(self):
+        self.content = None
+        self.uploads = {}
+        self.creates = 0
+        self.fail_chunk = None
+
+        self._ids = itertools.count()
+
+    def request(self, method, url, headers=None, data=None, **_):
+        content_range = headers.get('Content-Range')
+        upload_id = headers.get('Upload-ID')
+        if content_range is None:
+            self.content = data.read()
+            return response(200, data={'id': 'file'})
+
+        if content_range == 'bytes */*' and not upload_id:
+            self.creates += 1
+            upload_id = 'upload{}'.format(next(self._ids))
+            self.uploads[upload_id] = b''
+            return response(200, {'Upload-ID': upload_id, 'ETag': '"e"'})
+
+        committed = self.uploads[upload_id]
+        if content_range == 'bytes */*':
+            headers = {}
+            if committed:
+                headers['Range'] = 'bytes=0-{}'.format(len(committed) - 1)
+            return response(200, headers)
+
+        if content_range.endswith('/*'):
+            if self.fail_chunk is not None:
+                self.fail_chunk -= 1
+                if self.fail_chunk < 0:
+                    raise requests.exceptions.ConnectionError()
+            start = int(content_range.split()[1].split('-')[0])
+            if start != len(committed):
+                return response(416)
+            self.uploads[upload_id] = committed + data.read()
+            return response(200)
+
+        self.content = committed
+        del self.uploads[upload_id]
+        return response(200, data={'id': 'file'})
+
+
+class Unseekable(object):
+    def __init__(self, content):
+        self._stream = io.BytesIO(content)
+
+    def read(self, size=-1):
+        return self._stream.read(size)
+
+
+class UploadResumeTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.transport = FakeTransport()
+        self.api = APIClient(
+            InstanceConfiguration('aerofs.example.com'), 'token',
+            upload_checkpoints=UploadCheckpointStore(self.directory),
+            chunk_size=4, transport=self.transport, retry=False)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def interrupt(self, content, chunks=1):
+        # Uploads `content`, failing after `chunks` chunks were committed.
+        self.transport.fail_chunk = chunks
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            self.api.upload_file_content('file', io.BytesIO(content),
+                                         source_key='key')
+        self.transport.fail_chunk = None
+
+    def test_resume_same_content(self):
+        self.interrupt(b'abcdefghijkl')
+        self.api.upload_file_content('file', io.BytesIO(b'abcdefghijkl'),
+                                     source_key='key')
+
+        self.assertEqual(self.transport.content, b'abcdefghijkl')
+        self.assertEqual(self.transport.creates, 1)
+
+    def test_restart_changed_content(self):
+        self.interrupt(b'abcdefghijkl')
+        self.api.upload_file_content('file', io.BytesIO(b'ABCDefghijkl'),
+                                     source_key='key')
+
+        self.assertEqual(self.transport.content, b'ABCDefghijkl')
+        self.assertEqual(self.transport.creates, 2)
+
+    def test_changed_content_not_rewindable(self):
+        self.interrupt(b'abcdefghijkl')
+        with self.assertRaises(IOError):
+            self.api.upload_file_content(
+                'file', Unseekable(b'ABCDefghijkl'), source_key='key')
+        self.assertIsNone(self.api.upload_checkpoints.get('file'))
+
+
+if __name__ == '__main__':
+    unittest.main()